@@ -12,9 +12,11 @@
         'fleet',
         'stock',
         'sale',
+        'sale_stock',
         'crm',
         'customer_management',
         'mail',
+        'bus',
         'maintenance_app',
         'sale_management',
         'sales_team',
@@ -29,6 +31,7 @@
 
         # Data
         'data/ir_sequence.xml',
+        'data/ir_cron.xml',
 
         # Reports
         'reports/loading_form_report.xml',
@@ -39,6 +42,7 @@
         'wizard/loading_worker_wizard.xml', 
         'wizard/quantity_change_wizard.xml', 
         'wizard/warehouse_return_wizard.xml',
+        'wizard/bulk_warehouse_return_wizard.xml',
         # 'wizard/delivery_wizard.xml',
         'wizard/close_session_wizard.xml',
         'wizard/scrap_first_loading_wizard.xml',
@@ -52,10 +56,12 @@
         'views/product_template.xml',
         'views/loading_request.xml',
         'views/dashboard_analytic.xml',
+        'views/loading_stage_report.xml',
         'views/res_config_settings.xml',
         'views/sale_order.xml',
         'views/stock_picking.xml',
         'views/res_users.xml',
+        'views/notification_outbox.xml',
         
               
     ],
@@ -0,0 +1,184 @@
+"""
+EXPLAIN and timings of the loading request lookups on dispatch_time, with
+the indexes created by ice.loading.request.init() against the former
+single-column dispatch_time index.
+
+The script works on a scratch copy of the table's relevant columns, filled
+with synthetic rows, so it can be pointed at any PostgreSQL database:
+
+    python benchmarks/dispatch_time_indexes.py "dbname=bench" --rows 1000000
+
+The scratch table is dropped at the end.
+"""
+import argparse
+import statistics
+import time
+
+import psycopg2
+
+TABLE = 'ice_loading_request_bench'
+
+# Index sets compared, as (name, columns, where).
+SINGLE_COLUMN_INDEXES = [
+    ('bench_dispatch_time_index', 'dispatch_time', None),
+]
+MODULE_INDEXES = [
+    ('bench_car_dispatch_index', 'car_id, dispatch_time', None),
+    ('bench_urgent_car_dispatch_index', 'car_id, dispatch_time', 'is_urgent'),
+    ('bench_salesman_dispatch_index', 'salesman_id, dispatch_time', None),
+    ('bench_place_loading_index', 'loading_place_id, state', "state IN ('loading', 'started_second_loading')"),
+    ('bench_create_date_id_index', 'create_date, id', None),
+    ('bench_dispatch_state_priority_index', 'dispatch_time, state, priority', None),
+]
+
+STATES = [
+    'draft', 'car_checking', 'ready_for_loading', 'loading', 'ice_handled', 'plugged', 'delivering',
+    'ready_for_second_loading', 'started_second_loading', 'second_loading_delivering', 'session_closed',
+    'done', 'cancelled',
+]
+
+# (label, query, params): the lookups of the constraints and the dashboard.
+QUERIES = [
+    ("_check_car_open_request_per_day", f"""
+        SELECT count(*) FROM {TABLE}
+         WHERE car_id = 42 AND dispatch_time >= '2026-06-15 00:00:00' AND dispatch_time <= '2026-06-15 23:59:59'
+           AND state NOT IN ('done', 'cancelled', 'draft') AND id != 1
+    """),
+    ("_check_urgent_per_day", f"""
+        SELECT count(*) FROM {TABLE}
+         WHERE car_id = 42 AND is_urgent
+           AND dispatch_time >= '2026-06-15 00:00:00' AND dispatch_time <= '2026-06-15 23:59:59'
+    """),
+    ("_check_salesman_daily_loadings", f"""
+        SELECT salesman_id, date_trunc('day', dispatch_time), has_second_loading, count(*) FROM {TABLE}
+         WHERE salesman_id IN (7, 8, 9)
+           AND dispatch_time >= '2026-06-15 00:00:00' AND dispatch_time <= '2026-06-17 23:59:59'
+         GROUP BY 1, 2, 3
+    """),
+    ("_check_loading_capacity", f"""
+        SELECT count(*) FROM {TABLE}
+         WHERE loading_place_id = 2 AND state IN ('loading', 'started_second_loading')
+    """),
+    ("get_dashboard_status_distribution (1 day)", f"""
+        SELECT state, count(*) FROM {TABLE}
+         WHERE dispatch_time >= '2026-06-15 00:00:00' AND dispatch_time <= '2026-06-15 23:59:59'
+           AND state != 'cancelled'
+         GROUP BY state ORDER BY state
+    """),
+    ("get_dashboard_priority_distribution (1 week)", f"""
+        SELECT priority, count(*) FROM {TABLE}
+         WHERE dispatch_time >= '2026-06-15 00:00:00' AND dispatch_time <= '2026-06-21 23:59:59'
+           AND state NOT IN ('cancelled', 'done')
+         GROUP BY priority ORDER BY priority
+    """),
+    ("get_dashboard_recent_requests (page 2)", f"""
+        SELECT id, name, state, priority FROM {TABLE}
+         WHERE dispatch_time >= '2026-06-15 00:00:00' AND dispatch_time <= '2026-06-15 23:59:59'
+           AND (create_date, id) < ('2026-06-14 12:00:00'::timestamp, 999999999)
+         ORDER BY create_date DESC, id DESC LIMIT 20
+    """),
+]
+
+
+def create_table(cr, rows):
+    cr.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cr.execute(f"""
+        CREATE UNLOGGED TABLE {TABLE} (
+            id serial PRIMARY KEY,
+            name varchar,
+            state varchar,
+            priority integer,
+            dispatch_time timestamp,
+            create_date timestamp,
+            car_id integer,
+            salesman_id integer,
+            loading_place_id integer,
+            is_urgent boolean,
+            has_second_loading boolean
+        )
+    """)
+    # About 2,700 requests a day over a year: 500 cars, 300 salesmen, 4 places.
+    cr.execute(f"""
+        INSERT INTO {TABLE} (name, state, priority, dispatch_time, create_date, car_id, salesman_id,
+                             loading_place_id, is_urgent, has_second_loading)
+        SELECT 'LR/' || g,
+               (%s::varchar[])[1 + g %% %s],
+               1 + g %% 3,
+               timestamp '2026-01-01' + (g::float / %s) * interval '365 days',
+               timestamp '2026-01-01' + (g::float / %s) * interval '365 days' - interval '1 day',
+               1 + g %% 500,
+               1 + g %% 300,
+               1 + g %% 4,
+               g %% 20 = 0,
+               g %% 5 = 0
+          FROM generate_series(1, %s) g
+    """, [STATES, len(STATES), rows, rows, rows])
+    cr.execute(f"ANALYZE {TABLE}")
+
+
+def set_indexes(cr, indexes):
+    for name, _columns, _where in SINGLE_COLUMN_INDEXES + MODULE_INDEXES:
+        cr.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, columns, where in indexes:
+        cr.execute(f"CREATE INDEX {name} ON {TABLE} ({columns})" + (f" WHERE {where}" if where else ""))
+    cr.execute(f"ANALYZE {TABLE}")
+
+
+def time_query(cr, query, repeat):
+    timings = []
+    for _i in range(repeat):
+        start = time.perf_counter()
+        cr.execute(query)
+        cr.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def time_state_writes(cr, count):
+    """State transitions of ``count`` requests, i.e. the write cost of every index on state."""
+    start = time.perf_counter()
+    cr.execute(f"UPDATE {TABLE} SET state = 'loading', dispatch_time = dispatch_time + interval '1 minute'"
+               f" WHERE id <= %s", [count])
+    elapsed = (time.perf_counter() - start) * 1000
+    cr.connection.rollback()
+    return elapsed
+
+
+def run(cr, label, indexes, repeat, explain):
+    set_indexes(cr, indexes)
+    cr.connection.commit()
+    print(f"\n=== {label} ===")
+    for query_label, query in QUERIES:
+        if explain:
+            cr.execute("EXPLAIN (ANALYZE, BUFFERS) " + query)
+            print(f"\n-- {query_label}")
+            print("\n".join(row[0] for row in cr.fetchall()))
+        print(f"{query_label}: {time_query(cr, query, repeat):.2f} ms (median of {repeat})")
+    print(f"10,000 state writes: {time_state_writes(cr, 10000):.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dsn', help="libpq connection string of a scratch database")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--no-explain', dest='explain', action='store_false')
+    args = parser.parse_args()
+
+    with psycopg2.connect(args.dsn) as cnx, cnx.cursor() as cr:
+        start = time.perf_counter()
+        create_table(cr, args.rows)
+        cnx.commit()
+        print(f"{args.rows} rows generated in {time.perf_counter() - start:.1f} s")
+        try:
+            run(cr, "single-column dispatch_time index (former index=True)", SINGLE_COLUMN_INDEXES, args.repeat, args.explain)
+            run(cr, "module indexes (ice.loading.request.init)", MODULE_INDEXES, args.repeat, args.explain)
+            run(cr, "module indexes + single-column dispatch_time index",
+                MODULE_INDEXES + SINGLE_COLUMN_INDEXES, args.repeat, args.explain)
+        finally:
+            cr.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cnx.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 from . import loading_request
 from . import loading_quantity_change
 from . import ice_driver_session
+from . import ice_driver_session_inventory
 from . import maintenance_form
 from . import stock_picking
 from . import fleet_vehicle
 from . import loading_place
+from . import loading_bay_reservation
 from . import account_journal
 from . import res_config_settings
 from . import loading_request_customer_line
@@ -14,3 +16,8 @@ from . import sale_order
 from . import second_loading_product_line
 from . import res_users
 from . import second_loading_request_customer_line
+from . import loading_state_transition
+from . import loading_stage_report
+from . import loading_stage_duration
+from . import picking_validation_job
+from . import notification_outbox
@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class DashboardCache:
+    """
+    Process-wide TTL cache for the dashboard aggregates, namespaced per
+    database. Every open dashboard with the same date range and access scope
+    shares one computation per TTL window.
+
+    Each namespace is tagged with the data version the caller read from the
+    database. Writers bump that version once they commit, so every worker
+    drops its entries on its next lookup, and a value computed under an
+    older version is never stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = {}
+        self._stats = {}
+
+    def get_or_compute(self, dbname, key, ttl, compute, version):
+        """
+        :param version: current data version of the database; entries cached
+                        under another version are dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.setdefault(dbname, {'hits': 0, 'misses': 0})
+            if self._versions.get(dbname) != version:
+                self._versions[dbname] = version
+                for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == dbname]:
+                    del self._entries[entry_key]
+            entry = self._entries.get((dbname, key))
+            if entry and entry[0] > now:
+                stats['hits'] += 1
+                return entry[1]
+            stats['misses'] += 1
+        value = compute()
+        with self._lock:
+            if self._versions.get(dbname) == version:
+                self._entries[(dbname, key)] = (now + ttl, value)
+        return value
+
+    def get_stats(self, dbname):
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats.get(dbname, {'hits': 0, 'misses': 0}))
+            stats['entries'] = sum(
+                1 for (db, _key), (expiry, _value) in self._entries.items()
+                if db == dbname and expiry > now
+            )
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+dashboard_cache = DashboardCache()
@@ -1,4 +1,6 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+
+from .product_template import ICE_CAPACITY_FIELDS
 
 class FleetVehicle(models.Model):
     _inherit = 'fleet.vehicle'
@@ -22,4 +24,47 @@ class FleetVehicle(models.Model):
         string='Total Weight Capacity (kg)',
     )
     is_concrete = fields.Boolean(string='Is Concrete')
-    location_id = fields.Many2one('stock.location', string='Location', domain="[('usage', '=', 'internal')]")
\ No newline at end of file
+    location_id = fields.Many2one('stock.location', string='Location', domain="[('usage', '=', 'internal')]")
+
+    def write(self, vals):
+        if 'loading_status' not in vals and 'total_weight_capacity' not in vals:
+            res = super().write(vals)
+            self._clear_capacity_cache(vals)
+            return res
+        before = {vehicle.id: vehicle._get_dashboard_snapshot() for vehicle in self}
+        res = super().write(vals)
+        self._clear_capacity_cache(vals)
+        if any(before[vehicle.id] != vehicle._get_dashboard_snapshot() for vehicle in self):
+            self.env['ice.loading.request']._notify_dashboard()
+        return res
+
+    def _clear_capacity_cache(self, vals):
+        # Capacity matrices are cached per car id: new cars have no entry and
+        # the entries of deleted cars are never read again, so only capacity
+        # changes of existing cars need clearing.
+        if any(capacity_field in vals for capacity_field, _pcs_field in ICE_CAPACITY_FIELDS.values()):
+            self.env.registry.clear_cache()
+
+    def _get_dashboard_snapshot(self):
+        self.ensure_one()
+        return {
+            'loading_status': self.loading_status,
+            'total_weight_capacity': self.total_weight_capacity,
+        }
+
+    @tools.ormcache('self.id')
+    def _get_capacity_matrix(self):
+        """
+        Max load of this car per ice product type, as
+        {ice_product_type: (max_units, max_kg)}. Cached until the car's
+        capacities or the ice products' weights and pack sizes change.
+        """
+        self.ensure_one()
+        vehicle = self.sudo()
+        parameters = self.env['product.template']._get_ice_product_parameters()
+        matrix = {}
+        for ice_type, (capacity_field, _pcs_field) in ICE_CAPACITY_FIELDS.items():
+            max_units = vehicle[capacity_field]
+            weight, pcs = parameters.get(ice_type, (0.0, 0))
+            matrix[ice_type] = (max_units, max_units * weight * pcs if weight else max_units)
+        return matrix
@@ -18,6 +18,8 @@ class IceDriverSession(models.Model):
     loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', readonly=True, copy=False, ondelete='set null')
     driver_comment = fields.Text(string='Driver Comment')
 
+    inventory_ids = fields.Many2many(related='loading_request_id.van_inventory_ids', string='Van Inventory')
+
     state = fields.Selection([
         ('open', 'Open'),
         ('closed', 'Closed'),
@@ -33,4 +35,9 @@ class IceDriverSession(models.Model):
                 'session_end': fields.Datetime.now(),
                 'is_active': False,
                 'state': 'closed',
-            })
\ No newline at end of file
+            })
+
+    def _get_van_stock(self, products):
+        """Stock of ``products`` in the session's van, from the van inventory ledger."""
+        self.ensure_one()
+        return self.loading_request_id._get_van_stock(products)
\ No newline at end of file
@@ -0,0 +1,167 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from odoo.tools.sql import create_unique_index
+from collections import defaultdict
+
+# Ledger movements and the inventory column each one accumulates into.
+MOVEMENTS = [
+    ('loaded', 'Loaded'),
+    ('sold', 'Sold'),
+    ('returned', 'Returned'),
+    ('scrapped', 'Scrapped'),
+    ('adjusted', 'Adjusted'),
+]
+# Movements taking stock out of the van.
+OUTGOING_MOVEMENTS = {'sold', 'returned', 'scrapped'}
+
+class IceDriverSessionLedger(models.Model):
+    _name = 'ice.driver.session.ledger'
+    _description = 'Van Inventory Ledger'
+    _order = 'date desc, id desc'
+
+    location_id = fields.Many2one('stock.location', string='Van Location', required=True, readonly=True, index=True, ondelete='cascade')
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', readonly=True, index=True, ondelete='set null')
+    product_id = fields.Many2one('product.product', string='Product', required=True, readonly=True)
+    movement = fields.Selection(MOVEMENTS, string='Movement', required=True, readonly=True)
+    quantity = fields.Float(string='Quantity (Pcs)', required=True, readonly=True)
+    move_id = fields.Many2one('stock.move', string='Stock Move', readonly=True, ondelete='set null')
+    picking_id = fields.Many2one('stock.picking', string='Transfer', readonly=True, ondelete='set null')
+    scrap_id = fields.Many2one('stock.scrap', string='Scrap', readonly=True, ondelete='set null')
+    date = fields.Datetime(string='Date', required=True, readonly=True, default=fields.Datetime.now)
+
+    def write(self, vals):
+        raise UserError(_("Van inventory ledger entries cannot be modified."))
+
+    def unlink(self):
+        raise UserError(_("Van inventory ledger entries cannot be deleted."))
+
+    @api.model
+    def _post_move_lines(self, move_lines):
+        """
+        Record done move lines in and out of the tracked van locations: the
+        loads, the deliveries to customers, the returns and the scraps.
+        Customer returns into the van count as negative sales.
+        """
+        vals_list = []
+        for line in move_lines:
+            source, dest = line.location_id, line.location_dest_id
+            if line.state != 'done' or source == dest or not (source.is_van_location or dest.is_van_location):
+                continue
+            move = line.move_id
+            values = {
+                'product_id': line.product_id.id,
+                'loading_request_id': (move.picking_id.loading_request_id
+                                       or move.picking_id.sale_id.loading_request_id
+                                       or move.scrap_id.loading_request_id).id,
+                'move_id': move.id,
+                'picking_id': move.picking_id.id,
+                'scrap_id': move.scrap_id.id,
+            }
+            quantity = line.quantity_product_uom
+            if dest.is_van_location:
+                if source.usage == 'customer':
+                    movement, signed = 'sold', -quantity
+                elif source.usage == 'inventory':
+                    movement, signed = 'adjusted', quantity
+                else:
+                    movement, signed = 'loaded', quantity
+                vals_list.append(dict(values, location_id=dest.id, movement=movement, quantity=signed))
+            if source.is_van_location:
+                if move.scrapped or dest.scrap_location:
+                    movement, signed = 'scrapped', quantity
+                elif dest.usage == 'customer':
+                    movement, signed = 'sold', quantity
+                elif dest.usage == 'inventory':
+                    movement, signed = 'adjusted', -quantity
+                else:
+                    movement, signed = 'returned', quantity
+                vals_list.append(dict(values, location_id=source.id, movement=movement, quantity=signed))
+        self._post(vals_list)
+
+    @api.model
+    def _track_locations(self, locations):
+        """
+        Start keeping the ledger of ``locations``: flag them as van locations
+        and open them with what stock.quant holds there right now. From then
+        on every done move in or out of them is posted.
+        """
+        locations = locations.sudo().filtered(lambda location: not location.is_van_location)
+        if not locations:
+            return
+        # Concurrent openings of the same van both update its location row:
+        # the second one fails to serialize and is retried after the first.
+        locations.is_van_location = True
+        self._post([{
+            'location_id': location.id,
+            'product_id': product.id,
+            'movement': 'adjusted',
+            'quantity': quantity,
+        } for location, product, quantity in self.env['stock.quant'].sudo()._read_group(
+            [('location_id', 'in', locations.ids)], ['location_id', 'product_id'], ['quantity:sum'])
+          if quantity])
+
+    @api.model
+    def _post(self, vals_list):
+        if vals_list:
+            entries = self.sudo().create(vals_list)
+            self.env['ice.driver.session.inventory']._apply_entries(entries)
+
+
+class IceDriverSessionInventory(models.Model):
+    _name = 'ice.driver.session.inventory'
+    _description = 'Van Inventory'
+    _order = 'location_id, product_id'
+    _log_access = False
+
+    location_id = fields.Many2one('stock.location', string='Van Location', required=True, readonly=True, ondelete='cascade')
+    product_id = fields.Many2one('product.product', string='Product', required=True, readonly=True)
+    loaded = fields.Float(string='Loaded (Pcs)', readonly=True)
+    sold = fields.Float(string='Sold (Pcs)', readonly=True)
+    returned = fields.Float(string='Returned (Pcs)', readonly=True)
+    scrapped = fields.Float(string='Scrapped (Pcs)', readonly=True)
+    adjusted = fields.Float(string='Adjusted (Pcs)', readonly=True)
+    on_hand = fields.Float(string='In Van (Pcs)', readonly=True)
+
+    def init(self):
+        super().init()
+        create_unique_index(self.env.cr, 'ice_driver_session_inventory_key_index', self._table,
+                            ['location_id', 'product_id'])
+
+    @api.model
+    def _get_on_hand(self, location, products):
+        """
+        {product_id: pieces in ``location``}, one indexed lookup. The
+        location's ledger is opened on first use.
+        """
+        self.env['ice.driver.session.ledger']._track_locations(location)
+        return {
+            row.product_id.id: row.on_hand
+            for row in self.search([('location_id', '=', location.id), ('product_id', 'in', products.ids)])
+        }
+
+    @api.model
+    def _apply_entries(self, entries):
+        """Add ledger entries to the running totals with one upsert."""
+        totals = defaultdict(lambda: dict.fromkeys(dict(MOVEMENTS), 0.0))
+        for entry in entries:
+            totals[entry.location_id.id, entry.product_id.id][entry.movement] += entry.quantity
+        rows = [
+            SQL("(%s, %s, %s, %s, %s, %s, %s, %s)", location_id, product_id,
+                qty['loaded'], qty['sold'], qty['returned'], qty['scrapped'], qty['adjusted'],
+                sum(-quantity if movement in OUTGOING_MOVEMENTS else quantity for movement, quantity in qty.items()))
+            for (location_id, product_id), qty in sorted(totals.items())
+        ]
+        self.env.cr.execute(SQL("""
+            INSERT INTO ice_driver_session_inventory AS i
+                (location_id, product_id, loaded, sold, returned, scrapped, adjusted, on_hand)
+            VALUES %s
+            ON CONFLICT (location_id, product_id) DO UPDATE SET
+                loaded = i.loaded + EXCLUDED.loaded,
+                sold = i.sold + EXCLUDED.sold,
+                returned = i.returned + EXCLUDED.returned,
+                scrapped = i.scrapped + EXCLUDED.scrapped,
+                adjusted = i.adjusted + EXCLUDED.adjusted,
+                on_hand = i.on_hand + EXCLUDED.on_hand
+        """, SQL(", ").join(rows)))
+        self.invalidate_model()
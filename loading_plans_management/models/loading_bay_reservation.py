@@ -0,0 +1,78 @@
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Request state a car waits in for a bay, per state it is loaded in.
+WAITING_STATES = {
+    'loading': 'receive_key',
+    'started_second_loading': 'ready_for_second_loading',
+}
+# Request field stamped when a bay is granted, per loading state.
+START_DATE_FIELDS = {
+    'loading': 'loading_start_date',
+    'started_second_loading': 'second_loading_start_date',
+}
+
+class LoadingBayReservation(models.Model):
+    _name = 'ice.loading.bay.reservation'
+    _description = 'Loading Bay Reservation'
+    _order = 'priority asc, dispatch_time asc, id asc'
+
+    loading_place_id = fields.Many2one('ice.loading.place', string='Loading Place', required=True, index=True, ondelete='cascade')
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True, index=True, ondelete='cascade')
+    car_id = fields.Many2one(related='loading_request_id.car_id', string='Car')
+    priority = fields.Integer(related='loading_request_id.priority', store=True)
+    dispatch_time = fields.Datetime(related='loading_request_id.dispatch_time', store=True)
+    target_state = fields.Selection([
+        ('loading', 'First Loading'),
+        ('started_second_loading', 'Second Loading'),
+    ], string='Loading Type', required=True, default='loading')
+    state = fields.Selection([
+        ('waiting', 'Waiting'),
+        ('active', 'In Bay'),
+        ('released', 'Released'),
+    ], string='Status', required=True, default='waiting', index=True)
+    start_date = fields.Datetime(string='Bay Start', readonly=True)
+    end_date = fields.Datetime(string='Bay Release', readonly=True)
+    queue_position = fields.Integer(string='Queue Position', compute='_compute_queue_info')
+    estimated_start_date = fields.Datetime(string='Estimated Start', compute='_compute_queue_info')
+
+    @api.depends('state', 'start_date', 'loading_place_id.bay_count', 'loading_place_id.average_loading_minutes')
+    def _compute_queue_info(self):
+        schedules = {
+            place.id: place._get_queue_schedule()
+            for place in self.filtered(lambda r: r.state == 'waiting').loading_place_id
+        }
+        for reservation in self:
+            if reservation.state == 'waiting':
+                position, start = schedules[reservation.loading_place_id.id].get(reservation.id, (0, False))
+                reservation.queue_position = position
+                reservation.estimated_start_date = start
+            else:
+                reservation.queue_position = 0
+                reservation.estimated_start_date = reservation.start_date
+
+    def _activate(self):
+        """Grant the bay and move each request into its loading state."""
+        now = fields.Datetime.now()
+        for reservation in self:
+            reservation.write({'state': 'active', 'start_date': now})
+            reservation.loading_request_id.write({
+                'state': reservation.target_state,
+                START_DATE_FIELDS[reservation.target_state]: now,
+            })
+
+    def _release_stale(self):
+        """
+        Release reservations whose request has left both the waiting and the
+        loading state, then hand freed bays to the next cars in line.
+        """
+        stale = self.filtered(lambda r: r.loading_request_id.state not in (
+            r.target_state if r.state == 'active' else WAITING_STATES[r.target_state],
+        ))
+        if not stale:
+            return
+        freed_places = stale.filtered(lambda r: r.state == 'active').loading_place_id
+        stale.write({'state': 'released', 'end_date': fields.Datetime.now()})
+        freed_places._promote_waiting()
@@ -1,10 +1,13 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from datetime import timedelta
+import heapq
 
 class LoadingPlace(models.Model):
     _name = 'ice.loading.place'
     _description = 'Ice Loading Place'
-    
+
     name = fields.Selection(
         [("alahsa", "Alahsa"),
          ("dammam", "Dammam"),
@@ -14,10 +17,110 @@ class LoadingPlace(models.Model):
          string='Loading Place City',
          help="Select the city where the loading place is located."
     )
-    loading_location_id = fields.Many2one('stock.location', string='Loading Location', 
+    loading_location_id = fields.Many2one('stock.location', string='Loading Location',
                                         required=True, domain="[('usage', '=', 'internal')]")
-    
+
     priority = fields.Integer(string='Priority', default=10, help="Lower number means higher priority.")
 
-    
-   
\ No newline at end of file
+    bay_count = fields.Integer(string='Loading Bays', default=2, help="Number of cars that can be loaded at the same time.")
+    average_loading_minutes = fields.Integer(string='Average Loading Time (min)', default=30, help="Used to estimate when a queued car will reach a bay.")
+    bay_reservation_ids = fields.One2many('ice.loading.bay.reservation', 'loading_place_id', string='Bay Reservations',
+                                          domain=[('state', 'in', ('waiting', 'active'))])
+
+    @api.constrains('bay_count')
+    def _check_bay_count(self):
+        for place in self:
+            if place.bay_count < 1:
+                raise ValidationError(_("A loading place needs at least one loading bay."))
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'bay_count' in vals:
+            self._promote_waiting()
+        return res
+
+    def _lock_bays(self):
+        """
+        Serialize concurrent reservations on the places. A plain row lock is
+        not enough under repeatable read: the waiting transaction would go on
+        from its older snapshot and still see the bay as free. Updating the
+        rows instead makes it fail to serialize, and it is retried with a
+        fresh snapshot.
+        """
+        self.env.cr.execute(SQL(
+            "UPDATE ice_loading_place SET write_date = now() WHERE id IN %s", tuple(self.ids)))
+        self.invalidate_recordset(['write_date'])
+
+    def _reserve_bay(self, request, target_state='loading'):
+        """
+        Reserve a loading bay for ``request``. The car gets a bay immediately
+        when one is free, otherwise it joins the FIFO queue of the place.
+        :param request: ice.loading.request record.
+        :param target_state: request state the car is loaded in.
+        :return: the ice.loading.bay.reservation, 'active' or 'waiting'.
+        """
+        self.ensure_one()
+        self._lock_bays()
+        Reservation = self.env['ice.loading.bay.reservation']
+        reservation = Reservation.search([
+            ('loading_request_id', '=', request.id),
+            ('state', 'in', ('waiting', 'active')),
+        ], limit=1)
+        if not reservation:
+            reservation = Reservation.create({
+                'loading_place_id': self.id,
+                'loading_request_id': request.id,
+                'target_state': target_state,
+            })
+        self._promote_waiting()
+        return reservation
+
+    def _promote_waiting(self):
+        """Hand every free bay to the next waiting cars, in queue order."""
+        for place in self:
+            place._lock_bays()
+            free = place._get_free_bay_count()
+            if free > 0:
+                place._get_waiting_reservations()[:free]._activate()
+
+    def _get_loading_requests(self):
+        """Requests currently occupying a bay, with or without a reservation."""
+        self.ensure_one()
+        return self.env['ice.loading.request'].search([
+            ('loading_place_id', '=', self.id),
+            ('state', 'in', ['loading', 'started_second_loading']),
+        ])
+
+    def _get_free_bay_count(self):
+        self.ensure_one()
+        return self.bay_count - len(self._get_loading_requests())
+
+    def _get_waiting_reservations(self):
+        self.ensure_one()
+        return self.env['ice.loading.bay.reservation'].search([
+            ('loading_place_id', '=', self.id),
+            ('state', '=', 'waiting'),
+        ])
+
+    def _get_queue_schedule(self):
+        """
+        Estimate when each waiting car reaches a bay, assuming every load
+        takes ``average_loading_minutes``.
+        :return: {reservation_id: (queue_position, estimated_start)}
+        """
+        self.ensure_one()
+        now = fields.Datetime.now()
+        duration = timedelta(minutes=self.average_loading_minutes)
+        loading = self._get_loading_requests()
+        bays = []
+        for request in loading:
+            started = request.second_loading_start_date if request.state == 'started_second_loading' else request.loading_start_date
+            bays.append(max(now, (started or now) + duration))
+        bays += [now] * max(self.bay_count - len(loading), 0)
+        heapq.heapify(bays)
+        schedule = {}
+        for position, reservation in enumerate(self._get_waiting_reservations(), start=1):
+            start = heapq.heappop(bays)
+            schedule[reservation.id] = (position, start)
+            heapq.heappush(bays, start + duration)
+        return schedule
@@ -1,5 +1,4 @@
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -52,18 +51,9 @@ class LoadingProductLine(models.Model):
     @api.depends('loading_request_id.car_id', 'product_type','product_id.weight','product_id.pcs_per_bag','product_id.pcs_per_basket','product_id.pcs_for_concrete')
     def _compute_max_capacity_for_product(self):
         for line in self:
-            
-            if line.loading_request_id.car_id and line.product_type:
-                product = self.env['product.template'].search([('ice_product_type', '=', line.product_type)], limit=1)
-                car = line.loading_request_id.car_id
-                if line.product_type == '4kg':
-                    line.max_capacity_for_product = car.ice_4kg_capacity * product.weight * product.pcs_per_bag if product.weight else car.ice_4kg_capacity
-                elif line.product_type == '25kg':
-                    line.max_capacity_for_product = car.ice_25kg_capacity * product.weight * product.pcs_for_concrete if product.weight else car.ice_25kg_capacity
-                elif line.product_type == 'cup':
-                    line.max_capacity_for_product = car.ice_cup_capacity * product.weight * product.pcs_per_basket if product.weight else car.ice_cup_capacity
-                else:
-                    line.max_capacity_for_product = 0.0
+            car = line.loading_request_id.car_id
+            if car and line.product_type:
+                line.max_capacity_for_product = car._get_capacity_matrix().get(line.product_type, (0.0, 0.0))[1]
             else:
                 line.max_capacity_for_product = 0.0
     
@@ -97,44 +87,8 @@ class LoadingProductLine(models.Model):
  # EDIT 4: Enhanced capacity validation with specific messages
     @api.constrains('computed_weight', 'quantity', 'product_id', 'is_full_load')
     def _check_weight_capacity(self):
-        for line in self:
-            if not line.loading_request_id.car_id:
-                continue
-            
-            # Check if product has ice product type configured
-            product = self.env['product.template'].search([('ice_product_type', '=', line.product_type)], limit=1)
-            if line.product_id and not product.ice_product_type:
-                raise ValidationError(_(
-                    'Product "%s" does not have an ice product type configured. Please set the ice product type in the product form.'
-                ) % line.product_id.name)
-                
-            car = line.loading_request_id.car_id
-            
-            # Check individual product capacity based on product type
-            if line.product_type == '4kg' and line.computed_weight > car.ice_4kg_capacity * product.pcs_per_bag * product.weight if product.weight else car.ice_4kg_capacity:
-                ice_4kg_capacity = car.ice_4kg_capacity * product.pcs_per_bag * product.weight if product.weight else car.ice_4kg_capacity
-                raise ValidationError(_(
-                    '4kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg) for car %s'
-                ) % (line.computed_weight, ice_4kg_capacity, car.license_plate or car.name))
-
-            elif line.product_type == '25kg' and line.computed_weight > car.ice_25kg_capacity * product.pcs_for_concrete * product.weight if product.weight else car.ice_25kg_capacity:
-                ice_25kg_capacity = car.ice_25kg_capacity * product.pcs_for_concrete * product.weight if product.weight else car.ice_25kg_capacity
-                raise ValidationError(_(
-                    '25kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg) for car %s'
-                ) % (line.computed_weight, ice_25kg_capacity, car.license_plate or car.name))
-
-            elif line.product_type == 'cup' and line.computed_weight > car.ice_cup_capacity * product.pcs_per_basket * product.weight if product.weight else car.ice_cup_capacity:
-                ice_cup_capacity = car.ice_cup_capacity * product.pcs_per_basket * product.weight if product.weight else car.ice_cup_capacity
-                raise ValidationError(_(
-                    'Ice Cup weight (%.2f kg) exceeds car capacity (%.2f kg) for car %s'
-                ) % (line.computed_weight, ice_cup_capacity, car.license_plate or car.name))
-            
-            # Check total weight doesn't exceed car total capacity
-            total_weight = sum(line.loading_request_id.product_line_ids.mapped('computed_weight'))
-            if total_weight > car.total_weight_capacity:
-                raise ValidationError(_(
-                    'Total weight (%.2f kg) exceeds car total capacity (%.2f kg) for car %s'
-                ) % (total_weight, car.total_weight_capacity, car.license_plate or car.name))
+        # Validated per request, so every touched request is checked in one batch.
+        self.loading_request_id._check_product_lines_capacity(self._name)
                 
     # EDIT 5: Add onchange for quantity to check capacity in real-time
     @api.onchange('quantity', 'product_id', 'loading_request_id.car_id')
@@ -142,21 +96,18 @@ class LoadingProductLine(models.Model):
         """Check capacity when quantity changes"""
         if self.quantity and self.product_id and self.loading_request_id.car_id:
             car = self.loading_request_id.car_id
-            product = self.env['product.template'].search([('ice_product_type', '=', self.product_type)], limit=1)
-            # product_weight = self.product_id.weight or 0.0
-            computed_weight = self.quantity_in_pcs * product.weight if product.weight else 0.0
+            weight = self.env['product.template']._get_ice_product_parameters().get(self.product_type, (0.0, 0))[0]
+            computed_weight = self.quantity_in_pcs * weight if weight else 0.0
             
             # Check individual capacity
             warning_message = None
-            if self.product_type == '4kg' and computed_weight > car.ice_4kg_capacity * product.pcs_per_bag * product.weight if product.weight else car.ice_4kg_capacity:
-                warning_message = _('4kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg)') % (
-                    computed_weight, car.ice_4kg_capacity * product.pcs_per_bag * product.weight if product.weight else car.ice_4kg_capacity)
-            elif self.product_type == '25kg' and computed_weight > car.ice_25kg_capacity * product.pcs_for_concrete * product.weight if product.weight else car.ice_25kg_capacity:
-                warning_message = _('25kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg)') % (
-                    computed_weight, car.ice_25kg_capacity * product.pcs_for_concrete * product.weight if product.weight else car.ice_25kg_capacity)
-            elif self.product_type == 'cup' and computed_weight > car.ice_cup_capacity * product.pcs_per_basket * product.weight if product.weight else car.ice_cup_capacity:
-                warning_message = _('Ice Cup weight (%.2f kg) exceeds car capacity (%.2f kg)') % (
-                    computed_weight, car.ice_cup_capacity * product.pcs_per_basket * product.weight if product.weight else car.ice_cup_capacity)
+            max_weight = car._get_capacity_matrix().get(self.product_type, (0.0, 0.0))[1]
+            if self.product_type == '4kg' and computed_weight > max_weight:
+                warning_message = _('4kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg)') % (computed_weight, max_weight)
+            elif self.product_type == '25kg' and computed_weight > max_weight:
+                warning_message = _('25kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg)') % (computed_weight, max_weight)
+            elif self.product_type == 'cup' and computed_weight > max_weight:
+                warning_message = _('Ice Cup weight (%.2f kg) exceeds car capacity (%.2f kg)') % (computed_weight, max_weight)
 
             # Check total capacity
             total_weight = sum(self.loading_request_id.product_line_ids.mapped('computed_weight')) - self.computed_weight + computed_weight
@@ -170,4 +121,4 @@ class LoadingProductLine(models.Model):
                         'title': _('Capacity Warning'),
                         'message': warning_message
                     }
-                }
\ No newline at end of file
+                }
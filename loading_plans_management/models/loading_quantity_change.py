@@ -1,11 +1,15 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 from lxml import etree
+from collections import defaultdict
 from datetime import datetime, timedelta
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Once the ice is handled the loaded quantities can no longer change.
+LOCKED_STATES = ('ice_handled', 'plugged', 'in_transit', 'delivered', 'done', 'cancelled')
+
 class LoadingQuantityChange(models.Model):
     _name = 'ice.loading.quantity.change'
     _description = 'Loading Request Quantity Change History'
@@ -17,4 +21,67 @@ class LoadingQuantityChange(models.Model):
     new_quantity = fields.Float(string='New Quantity', required=True)
     change_reason = fields.Text(string='Reason for Change', required=True)
     changed_by_id = fields.Many2one('res.users', string='Changed By', required=True, default=lambda self: self.env.user)
-    change_date = fields.Datetime(string='Change Date', required=True, default=fields.Datetime.now)
\ No newline at end of file
+    change_date = fields.Datetime(string='Change Date', required=True, default=fields.Datetime.now)
+
+    @api.model
+    def _apply_changes(self, new_quantities, reason):
+        """
+        Apply new loading quantities to any number of requests in one pass.
+        The differences with the current product lines are recorded with a
+        single create; product lines and the moves of reserved internal
+        transfers are updated with one write per distinct quantity.
+        :param new_quantities: {ice.loading.request: {product.product: quantity in bags/baskets/pieces}}
+        :param reason: reason recorded on every history row.
+        :return: the created ice.loading.quantity.change records.
+        :raise UserError: when a request has several lines for a changed
+                          product; a quantity per product cannot tell them apart.
+        """
+        locked = [request.name for request in new_quantities if request.state in LOCKED_STATES]
+        if locked:
+            raise UserError(_('Cannot change quantities after the request has been ice handled: %s') % ', '.join(locked))
+
+        history_vals = []
+        lines_by_quantity = defaultdict(lambda: self.env['ice.loading.product.line'])
+        moves_by_demand = defaultdict(lambda: self.env['stock.move'])
+        pickings = self.env['stock.picking']
+        for request, quantities in new_quantities.items():
+            product_lines = {}
+            for line in request.product_line_ids:
+                if line.product_id in product_lines and line.product_id in quantities:
+                    raise UserError(_("Request %s has several lines for %s: merge them before changing its quantity.")
+                                    % (request.name, line.product_id.display_name))
+                product_lines[line.product_id] = line
+            picking = request.internal_transfer_id
+            moves = {}
+            if picking.state == 'assigned':
+                moves = {move.product_id: move for move in picking.move_ids_without_package}
+            for product, quantity in quantities.items():
+                line = product_lines.get(product)
+                if not line or line.quantity == quantity:
+                    continue
+                history_vals.append({
+                    'loading_request_id': request.id,
+                    'product_id': product.id,
+                    'old_quantity': line.quantity,
+                    'new_quantity': quantity,
+                    'change_reason': reason,
+                })
+                lines_by_quantity[quantity] |= line
+                move = moves.get(product)
+                if move:
+                    # Moves are in pieces, product lines in bags/baskets/pieces.
+                    moves_by_demand[quantity * product._get_ice_pcs_per_unit()] |= move
+                    pickings |= picking
+
+        changes = self.create(history_vals)
+        for quantity, lines in lines_by_quantity.items():
+            lines.write({'quantity': quantity, 'is_full_load': False})
+        for qty_in_pcs, moves in moves_by_demand.items():
+            moves.write({'product_uom_qty': qty_in_pcs})
+        if pickings:
+            pickings.action_assign()
+
+        message = _("Quantities changed by %s<br/>Reason: %s") % (self.env.user.name, reason)
+        for request in changes.loading_request_id:
+            request.message_post(body=message, subject=_('Loading Quantities Changed'))
+        return changes
@@ -1,11 +1,42 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
-from lxml import etree
+from odoo.tools import SQL
+from odoo.tools.sql import create_index, drop_index, make_index_name
+from collections import defaultdict
 from datetime import datetime, timedelta
 import logging
 
+from .dashboard_cache import dashboard_cache
+
 _logger = logging.getLogger(__name__)
 
+# Bus channel pinged when the dashboard figures change; the ping carries no data.
+DASHBOARD_CHANNEL = 'ice_loading_dashboard'
+# Database sequence bumped whenever the dashboard figures change, so every
+# worker knows its cached aggregates are stale.
+DASHBOARD_VERSION_SEQUENCE = 'ice_loading_dashboard_version'
+# Once a request reaches these states its kanban card can no longer be moved.
+LOCKED_STATES = [
+    'loading', 'ice_handled', 'plugged', 'paused', 'sign_form', 'delivering', 'delivered',
+    'second_loading_request', 'empty_scrap', 'ready_for_second_loading', 'started_second_loading',
+    'second_loading_done', 'second_loading_delivering', 'session_closed', 'done', 'cancelled',
+]
+# Transition buttons that can be run on a selection of requests, with the
+# groups allowed to run them: the groups of their form buttons.
+BATCH_TRANSITIONS = {
+    'action_confirm_request': ['sales_team.group_sale_salesman_all_leads'],
+    'action_receive_car_keys': [],
+    'action_continue_loading': ['loading_plans_management.group_fleet_supervisor'],
+    'action_proceed_to_plugged': ['loading_plans_management.group_fleet_supervisor', 'fleet.fleet_group_manager'],
+    'action_start_second_loading': [],
+    'action_handle_car': ['loading_plans_management.group_fleet_supervisor', 'fleet.fleet_group_manager'],
+}
+# Fields whose change can move a request between dashboard counters.
+DASHBOARD_TRIGGER_FIELDS = {
+    'state', 'priority', 'dispatch_time', 'is_urgent', 'has_second_loading',
+    'loading_place_id', 'is_warehouse_check', 'is_car_received', 'cash_payment_id',
+}
+
 class LoadingRequest(models.Model):
     _name = 'ice.loading.request'
     _description = 'Ice Loading Request'
@@ -35,6 +66,9 @@ class LoadingRequest(models.Model):
         ('done', 'Done'),
         ('cancelled', 'Cancelled'),
     ], string='Status', default='draft', tracking=True)
+    bay_queue_position = fields.Integer(string='Bay Queue Position', compute='_compute_bay_queue')
+    bay_estimated_start = fields.Datetime(string='Estimated Bay Start', compute='_compute_bay_queue')
+    is_locked = fields.Boolean(string='Locked', compute='_compute_is_locked', help="The request has started loading and its card shows a lock.")
     can_close_session = fields.Boolean(string='Can Close Session', default=False, help="Indicates if the session can be closed after delivery.")
     can_close_second_session = fields.Boolean(string='Can Close Second Session', default=False, help="Indicates if the session can be closed after delivery.")
     car_checking_start_date = fields.Datetime(string='Car Checking Start Date', readonly=True, copy=False)
@@ -119,24 +153,89 @@ class LoadingRequest(models.Model):
     return_picking_count = fields.Integer(compute='_compute_request_counts')
     quantity_changes_count = fields.Integer(compute='_compute_request_counts')
     sale_order_ids = fields.One2many('sale.order', 'loading_request_id', string='Sales Orders')
+    van_inventory_ids = fields.Many2many('ice.driver.session.inventory', string='Van Inventory', compute='_compute_van_inventory_ids')
+    van_ledger_ids = fields.One2many('ice.driver.session.ledger', 'loading_request_id', string='Van Inventory Ledger', readonly=True)
     sale_order_count = fields.Integer(compute='_compute_sale_order_count', string="Sales Orders")
+    picking_validation_job_ids = fields.One2many('ice.picking.validation.job', 'loading_request_id', string='Transfer Validations', readonly=True)
+    picking_validation_state = fields.Selection([
+        ('pending', 'Validating Transfer'),
+        ('failed', 'Transfer Validation Failed'),
+    ], string='Transfer Validation', compute='_compute_picking_validation_state')
+    state_transition_ids = fields.One2many('ice.loading.state.transition', 'loading_request_id', string='State History', readonly=True)
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        # _check_car_open_request_per_day / _check_urgent_per_day: one car, one day.
+        create_index(cr, 'ice_loading_request_car_dispatch_index', self._table, ['car_id', 'dispatch_time'])
+        create_index(cr, 'ice_loading_request_urgent_car_dispatch_index', self._table,
+                     ['car_id', 'dispatch_time'], where='is_urgent')
+        # _check_salesman_daily_loadings: one or more salesmen over a day range.
+        create_index(cr, 'ice_loading_request_salesman_dispatch_index', self._table, ['salesman_id', 'dispatch_time'])
+        # _check_loading_capacity: cars currently in a loading bay of a place.
+        create_index(cr, 'ice_loading_request_place_loading_index', self._table, ['loading_place_id', 'state'],
+                     where="state IN ('loading', 'started_second_loading')")
+        # get_dashboard_recent_requests: keyset pagination, newest first.
+        create_index(cr, 'ice_loading_request_create_date_id_index', self._table, ['create_date', 'id'])
+        # _get_dashboard_cached: data version shared by every worker.
+        cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(DASHBOARD_VERSION_SEQUENCE)))
+        # get_dashboard_*_distribution: per-state / per-priority counts over a day range.
+        # It also serves every lookup leading with dispatch_time, so the
+        # former single-column index only cost writes (plans and timings:
+        # benchmarks/dispatch_time_indexes.py).
+        create_index(cr, 'ice_loading_request_dispatch_state_priority_index', self._table,
+                     ['dispatch_time', 'state', 'priority'])
+        drop_index(cr, make_index_name(self._table, 'dispatch_time'), self._table)
+        # is_locked is no longer stored.
+        cr.execute(SQL("ALTER TABLE %s DROP COLUMN IF EXISTS is_locked", SQL.identifier(self._table)))
+
+    @api.depends('is_concrete', 'car_id.location_id', 'salesman_id.accessible_location_id')
+    def _compute_van_inventory_ids(self):
+        inventory = self.env['ice.driver.session.inventory']
+        for request in self:
+            location = request._get_van_location()
+            request.van_inventory_ids = inventory.search([('location_id', '=', location.id)]) if location else inventory
 
     @api.depends('sale_order_ids')
     def _compute_sale_order_count(self):
         for request in self:
             request.sale_order_count = len(request.sale_order_ids)
 
+    @api.depends('picking_validation_job_ids.state')
+    def _compute_picking_validation_state(self):
+        for request in self:
+            states = set(request.picking_validation_job_ids.mapped('state'))
+            request.picking_validation_state = 'failed' if 'failed' in states else 'pending' if 'pending' in states else False
+
+    def action_retry_picking_validation(self):
+        self.picking_validation_job_ids.sudo().action_retry()
+        return self._action_refresh()
+
+    def _compute_bay_queue(self):
+        waiting = self.env['ice.loading.bay.reservation'].search([
+            ('loading_request_id', 'in', self.ids),
+            ('state', '=', 'waiting'),
+        ])
+        by_request = {reservation.loading_request_id.id: reservation for reservation in waiting}
+        for request in self:
+            reservation = by_request.get(request.id)
+            request.bay_queue_position = reservation.queue_position if reservation else 0
+            request.bay_estimated_start = reservation.estimated_start_date if reservation else False
+
+    @api.depends('state')
+    def _compute_is_locked(self):
+        for request in self:
+            request.is_locked = request.state in LOCKED_STATES
+
     @api.model
-    def fields_view_get(self, view_id=None, view_type='form', toolbar=False, submenu=False):
-        res = super(LoadingRequest, self).fields_view_get(view_id=view_id, view_type=view_type, toolbar=toolbar, submenu=submenu)
+    def _get_view(self, view_id=None, view_type='form', **options):
+        # Depends only on the user's groups, so the arch stays in the view cache;
+        # individual cards show their lock through the non-stored ``is_locked``.
+        arch, view = super()._get_view(view_id, view_type, **options)
         if view_type == 'kanban' and self.env.user.has_group('sales_team.group_sale_manager'):
-            doc = etree.XML(res['arch'])
-            for node in doc.xpath("//kanban"):
-                for record in self.search([]):
-                    if record.state in ['loading', 'ice_handled', 'plugged', 'paused', 'sign_form', 'delivering', 'delivered', 'second_loading_request', 'empty_scrap', 'ready_for_second_loading', 'started_second_loading', 'second_loading_done', 'second_loading_delivering', 'session_closed', 'done', 'cancelled']:
-                        node.set('records_draggable', 'false')
-            res['arch'] = etree.tostring(doc)
-        return res
+            for node in arch.xpath("//kanban"):
+                node.set('records_draggable', 'false')
+        return arch, view
     
     @api.depends(
     'car_check_request_id',
@@ -225,7 +324,7 @@ class LoadingRequest(models.Model):
             request.priority = priority
     @api.constrains('state', 'loading_place_id')
     def _check_loading_capacity(self):
-        """Constraint to ensure only 2 requests can be in 'loading' state per place."""
+        """Constraint to ensure a place never loads more cars than it has bays."""
         for request in self:
             if request.state == 'loading':
                 domain = [
@@ -234,8 +333,8 @@ class LoadingRequest(models.Model):
                     ('id', '!=', request.id)
                 ]
                 loading_count = self.search_count(domain)
-                if loading_count >= 2:
-                    raise ValidationError(_("A loading place can only have a maximum of 2 cars loading at the same time."))
+                if loading_count >= request.loading_place_id.bay_count:
+                    raise ValidationError(_("A loading place can only have a maximum of %d cars loading at the same time.") % request.loading_place_id.bay_count)
                 
     @api.constrains('car_id', 'dispatch_time','state')
     def _check_car_open_request_per_day(self):
@@ -286,22 +385,34 @@ class LoadingRequest(models.Model):
     
     @api.constrains('salesman_id', 'dispatch_time', 'has_second_loading')
     def _check_salesman_daily_loadings(self):
-        for request in self:
-            # Base domain for same salesman on same day (excluding current record)
-            base_domain = [
-                ('salesman_id', '=', request.salesman_id.id),
-                ('dispatch_time', '>=', fields.Date.start_of(request.dispatch_time, 'day')),
-                ('dispatch_time', '<=', fields.Date.end_of(request.dispatch_time, 'day')),
-                ('id', '!=', request.id),
+        requests = self.filtered(lambda r: r.salesman_id and r.dispatch_time)
+        if not requests:
+            return
+        # One grouped count per (salesman, dispatch day, has_second_loading)
+        # covering every record being validated. Days are UTC days, as in the
+        # per-record day bounds this replaces.
+        days = [request.dispatch_time.date() for request in requests]
+        groups = self.with_context(tz=False)._read_group(
+            [
+                ('salesman_id', 'in', requests.salesman_id.ids),
+                ('dispatch_time', '>=', min(days)),
+                ('dispatch_time', '<', max(days) + timedelta(days=1)),
                 ('state', 'not in', ['cancelled', 'draft']),
                 ('is_concrete', '=', False),
-            ]
-            
-            # Check existing requests with second loading
-            existing_with_second_loading = self.search_count(base_domain + [('has_second_loading', '=', True)])
-            
-            # Check existing requests without second loading
-            existing_without_second_loading = self.search_count(base_domain + [('has_second_loading', '=', False)])
+            ],
+            ['salesman_id', 'dispatch_time:day', 'has_second_loading'],
+            ['__count'],
+        )
+        counts = defaultdict(int)
+        for salesman, day, has_second_loading, count in groups:
+            counts[(salesman.id, fields.Date.to_date(day), bool(has_second_loading))] += count
+
+        for request in requests:
+            key = (request.salesman_id.id, request.dispatch_time.date())
+            # The record itself is already flushed; leave it out of its own counts.
+            counted = request.state not in ('cancelled', 'draft') and not request.is_concrete
+            existing_with_second_loading = counts.get(key + (True,), 0) - (1 if counted and request.has_second_loading else 0)
+            existing_without_second_loading = counts.get(key + (False,), 0) - (1 if counted and not request.has_second_loading else 0)
             
             if request.has_second_loading:
                 # If current request has second loading
@@ -383,6 +494,128 @@ class LoadingRequest(models.Model):
                 if journal.credit_limit > 0 and journal.balance > journal.credit_limit:
                      raise ValidationError(_("Salesman has exceeded the credit limit of %s. Current balance is %s.") % (journal.credit_limit, journal.balance))
 
+    def _get_van_location(self):
+        """Stock location holding what the van carries: the car for concrete requests, the salesman otherwise."""
+        self.ensure_one()
+        if self.is_concrete:
+            return self.car_id.location_id
+        return self.salesman_id.accessible_location_id
+
+    def _get_van_stock(self, products, location=None):
+        """
+        On-hand quantity of every product in the van, read from the van
+        inventory ledger rather than summed over stock.quant.
+        :param products: product.product recordset.
+        :param location: stock location to read, the van location by default.
+        :return: {product_id: (quantity in bags/baskets/pieces, quantity in pieces)}
+        """
+        self.ensure_one()
+        location = location if location is not None else self._get_van_location()
+        on_hand = {}
+        if products and location:
+            on_hand = self.env['ice.driver.session.inventory']._get_on_hand(location, products)
+        stock = {}
+        for product in products:
+            qty_pcs = on_hand.get(product.id) or 0.0
+            stock[product.id] = (qty_pcs / product._get_ice_pcs_per_unit(), qty_pcs)
+        return stock
+
+    @api.model
+    def _get_concrete_prices(self, product, customer_quantities):
+        """
+        Unit price of ``product`` for every customer, from the customer's
+        pricelist when it has a rule for the product and the list price
+        otherwise. The rules of all the pricelists are read at once and a
+        price is computed once per pricelist and quantity bracket, i.e. the
+        highest rule minimum quantity reached, so customers sharing a
+        pricelist share the computation.
+        :param customer_quantities: list of (res.partner, quantity) pairs.
+        :return: list of (pricelist, price), in the order of ``customer_quantities``.
+        """
+        pricelists = self.env['product.pricelist'].union(
+            *(customer.property_product_pricelist for customer, _quantity in customer_quantities))
+        rules = defaultdict(lambda: {'has_product_rule': False, 'nested': False, 'min_quantities': {0.0}})
+        for item in self.env['product.pricelist.item'].search([('pricelist_id', 'in', pricelists.ids)]):
+            pricelist_rules = rules[item.pricelist_id.id]
+            if item.product_id == product or item.product_tmpl_id == product.product_tmpl_id:
+                pricelist_rules['has_product_rule'] = True
+            # A rule based on another pricelist may have brackets of its own.
+            if item.base == 'pricelist':
+                pricelist_rules['nested'] = True
+            pricelist_rules['min_quantities'].add(item.min_quantity)
+
+        prices = {}
+        result = []
+        for customer, quantity in customer_quantities:
+            pricelist = customer.property_product_pricelist
+            pricelist_rules = rules.get(pricelist.id)
+            if not pricelist_rules or not pricelist_rules['has_product_rule']:
+                result.append((pricelist, product.lst_price))
+                continue
+            if pricelist_rules['nested']:
+                bracket = quantity
+            else:
+                bracket = max(q for q in pricelist_rules['min_quantities'] if q <= quantity)
+            key = (pricelist.id, bracket)
+            if key not in prices:
+                prices[key] = pricelist._get_product_price(product, quantity) or product.lst_price
+            result.append((pricelist, prices[key]))
+        return result
+
+    def _create_concrete_sale_orders(self, customer_quantities):
+        """
+        Create the concrete sale orders of a session in one batch, confirm
+        them together and deliver them from the car.
+        :param customer_quantities: list of (res.partner, quantity) pairs.
+        :return: sale.order recordset, in the order of ``customer_quantities``.
+        """
+        self.ensure_one()
+        if not customer_quantities:
+            return self.env['sale.order']
+        product_25kg = self.env.company.product_25kg_id.product_variant_id
+        if not product_25kg:
+            raise UserError(_("Default 25kg Ice Product is not configured in settings."))
+        car_location = self.car_id.location_id
+        # Deliveries of the car's own warehouse already leave from the car.
+        warehouse = self.env['stock.warehouse'].search([('lot_stock_id', '=', car_location.id)], limit=1)
+        prices = self._get_concrete_prices(product_25kg, customer_quantities)
+        vals_list = []
+        for (customer, quantity), (pricelist, price) in zip(customer_quantities, prices):
+            vals_list.append({
+                'partner_id': customer.id,
+                'order_line': [(0, 0, {
+                    'product_id': product_25kg.id,
+                    'product_uom_qty': quantity,
+                    'name': product_25kg.display_name,
+                    'price_unit': price,
+                })],
+                'is_concrete': True,
+                'loading_request_id': self.id,
+                'car_id': self.car_id.id,
+                'user_id': self.team_leader_id.id,
+                'pricelist_id': pricelist.id if pricelist else None,
+                'warehouse_id': warehouse.id if warehouse else None,
+            })
+        orders = self.env['sale.order'].create(vals_list)
+        if not orders:
+            return orders
+        orders.action_confirm()
+
+        pickings = orders.picking_ids.filtered(lambda p: p.state not in ('done', 'cancel'))
+        if pickings:
+            misplaced = pickings.filtered(lambda p: p.location_id != car_location)
+            if misplaced:
+                misplaced.do_unreserve()
+                misplaced.write({'location_id': car_location.id})
+            pickings.write({'user_id': self.salesman_id.id})
+            pickings.action_assign()
+            for move_line in pickings.move_line_ids:
+                if move_line.quantity_product_uom != move_line.quantity:
+                    move_line.quantity = move_line.quantity_product_uom
+            pickings.button_validate()
+        _logger.info("Created %s concrete sale order(s) for %s", len(orders), self.name)
+        return orders
+
     def _get_default_product_lines_values(self, concrete=False):
         """
         Refactored method: returns a list of values for product lines
@@ -545,14 +778,58 @@ class LoadingRequest(models.Model):
             'context': {'default_loading_request_id': self.id}
         }
     
+    def _action_refresh(self):
+        """
+        Button result that reloads only the current view's records (the form
+        or the kanban cards) instead of restarting the whole web client.
+        """
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'soft_reload',
+        }
+
+    def action_batch_transition(self, method):
+        """
+        Run one transition button on every selected request. Each request is
+        processed in its own savepoint, so a request that cannot move does
+        not roll back the others; the refusals are reported together.
+        :param method: one of BATCH_TRANSITIONS.
+        """
+        if method not in BATCH_TRANSITIONS:
+            raise UserError(_("%s cannot be applied to several loading requests at once.") % method)
+        groups = BATCH_TRANSITIONS[method]
+        if groups and not any(self.env.user.has_group(group) for group in groups):
+            raise UserError(_("You are not allowed to run %s on loading requests.") % method)
+        done = self.browse()
+        errors = []
+        for request in self:
+            try:
+                with self.env.cr.savepoint():
+                    getattr(request, method)()
+                done |= request
+            except (UserError, ValidationError) as e:
+                errors.append('%s: %s' % (request.name, e.args[0]))
+        _logger.info("Batch %s: %s done, %s refused", method, len(done), len(errors))
+        message = _("%s of %s loading requests processed.") % (len(done), len(self))
+        if errors:
+            message += '\n' + '\n'.join(errors)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Loading Requests'),
+                'message': message,
+                'type': 'warning' if errors else 'success',
+                'sticky': bool(errors),
+                'next': self._action_refresh(),
+            },
+        }
+
     def action_continue_loading(self):
         self.ensure_one()
         self.message_post(body=_('Loading continued by %s.') % self.env.user.name)
         self.write({'state': 'plugged'})
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        return self._action_refresh()
 
     
     def write(self, vals):
@@ -586,8 +863,31 @@ class LoadingRequest(models.Model):
                     body=_('Car changed from %s to %s') % (old_car, new_car_name),
                     subject=_('Car Changed')
                 )
-        
-        return super().write(vals)
+
+        before = self._get_dashboard_snapshots() if DASHBOARD_TRIGGER_FIELDS.intersection(vals) else {}
+        old_states = {record.id: record.state for record in self} if 'state' in vals else {}
+        if 'dispatch_time' in vals:
+            self.env['ice.loading.stage.duration.dirty']._mark_days(
+                record.dispatch_time.date() for record in self if record.dispatch_time)
+        res = super().write(vals)
+        if old_states:
+            self._log_state_transitions(old_states)
+            self.env['ice.loading.bay.reservation'].search([
+                ('loading_request_id', 'in', self.ids),
+                ('state', 'in', ('waiting', 'active')),
+            ])._release_stale()
+        if before:
+            self._publish_dashboard_changes(before)
+        return res
+
+    def unlink(self):
+        before = self._get_dashboard_snapshots()
+        self.env['ice.loading.stage.duration.dirty']._mark_days(
+            record.dispatch_time.date() for record in self if record.dispatch_time)
+        res = super().unlink()
+        if before:
+            self._notify_dashboard()
+        return res
     
     def action_print_loading_form(self):
         """Print loading form for salesman signature"""
@@ -654,55 +954,7 @@ class LoadingRequest(models.Model):
     
     def _notify_form_upload(self, form_type):
         """Notify relevant people about form upload"""
-        recipients = []
-        
-        # Notify salesman
-        if self.salesman_id:
-            recipients.append(self.salesman_id.partner_id.id)
-        
-        # Notify team leader
-        if self.team_leader_id:
-            recipients.append(self.team_leader_id.partner_id.id)
-        
-        # Notify sales supervisor
-        try:
-            sales_supervisor_group = self.env.ref('loading_plans_management.group_sales_supervisor')
-            for user in sales_supervisor_group.users:
-                recipients.append(user.partner_id.id)
-        except:
-            pass
-        
-        if recipients:
-            form_messages = {
-                # 'freezer_release': 'Freezer Release Form has been signed and uploaded',
-                'loading_form': 'Loading Form has been signed and uploaded'
-            }
-            
-            subject = _('%s for Loading Request %s') % (form_messages.get(form_type, 'Form'), self.name)
-            message = _("""
-            <p>The <strong>%s</strong> has been signed and uploaded for loading request <strong>%s</strong>:</p>
-            <ul>
-                <li><strong>Car:</strong> %s</li>
-                <li><strong>Salesman:</strong> %s</li>
-                <li><strong>Uploaded by:</strong> %s</li>
-                <li><strong>Upload Date:</strong> %s</li>
-                <li><strong>Status:</strong> %s</li>
-            </ul>
-            """) % (
-                form_messages.get(form_type, 'Form'),
-                self.name,
-                self.car_id.license_plate or self.car_id.name,
-                self.salesman_id.name,
-                self.env.user.name,
-                fields.Datetime.now().strftime('%Y-%m-%d %H:%M'),
-                dict(self._fields['state'].selection)[self.state]
-            )
-            
-            self.message_notify(
-                partner_ids=list(set(recipients)),
-                subject=subject,
-                body=message,
-            )
+        self.env['ice.notification.outbox']._enqueue(self, 'form_uploaded', form_type=form_type)
 
     def action_change_car(self):
         """Open car change wizard with status validation"""
@@ -767,10 +1019,58 @@ class LoadingRequest(models.Model):
         # Notify salesman and team
         self._notify_car_ready_for_dispatch()
         
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
+        return self._action_refresh()
+    def _check_product_lines_capacity(self, line_model):
+        """
+        Validate the product lines of every request in ``self`` against its
+        car in one pass: line weights are summed per request and product type
+        by a single grouped query and compared with the car capacity matrix.
+        :param line_model: 'ice.loading.product.line' or
+                           'second.ice.loading.product.line'.
+        :raise ValidationError: listing every violation found.
+        """
+        requests = self.filtered('car_id')
+        if not requests:
+            return
+        groups = self.env[line_model]._read_group(
+            [('loading_request_id', 'in', requests.ids)],
+            ['loading_request_id', 'product_id', 'product_type'],
+            ['computed_weight:sum'],
+        )
+        parameters = self.env['product.template']._get_ice_product_parameters()
+        messages = {
+            '4kg': _('4kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg) for car %s'),
+            '25kg': _('25kg Ice weight (%.2f kg) exceeds car capacity (%.2f kg) for car %s'),
+            'cup': _('Ice Cup weight (%.2f kg) exceeds car capacity (%.2f kg) for car %s'),
         }
+        errors = []
+        type_weights = defaultdict(float)
+        total_weights = defaultdict(float)
+        for request, product, product_type, weight in groups:
+            total_weights[request.id] += weight
+            if product and product_type not in parameters:
+                errors.append(_(
+                    'Product "%s" does not have an ice product type configured. Please set the ice product type in the product form.'
+                ) % product.name)
+            elif product_type:
+                type_weights[request.id, product_type] += weight
+
+        for request in requests:
+            car = request.car_id
+            car_name = car.license_plate or car.name
+            matrix = car._get_capacity_matrix()
+            for product_type, message in messages.items():
+                weight = type_weights[request.id, product_type]
+                max_weight = matrix[product_type][1]
+                if weight > max_weight:
+                    errors.append(message % (weight, max_weight, car_name))
+            if total_weights[request.id] > car.total_weight_capacity:
+                errors.append(_(
+                    'Total weight (%.2f kg) exceeds car total capacity (%.2f kg) for car %s'
+                ) % (total_weights[request.id], car.total_weight_capacity, car_name))
+        if errors:
+            raise ValidationError('\n'.join(errors))
+
     @api.depends('product_line_ids.computed_weight')
     def _compute_total_weight(self):
         for record in self:
@@ -787,55 +1087,91 @@ class LoadingRequest(models.Model):
         if self.state != 'draft':
             raise UserError(_("You can only confirm a request in 'Draft' state."))
         self._create_related_records()
-        # self._send_creation_notifications()
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        if self.env.company.ice_notify_request_creation:
+            self._send_creation_notifications()
+        return self._action_refresh()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Everything that does not depend on the individual record is resolved
+        # once per batch: sequence numbers, salesman teams and default lines.
+        names = iter(self._reserve_sequence_names(
+            sum(1 for vals in vals_list if vals.get('name', 'New') == 'New')))
+        teams = {}
+        default_lines = {}
+        for vals in vals_list:
+            # Set sequence, team leader, etc.
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = next(names)
+            if 'salesman_id' in vals and vals['salesman_id']:
+                if vals['salesman_id'] not in teams:
+                    teams[vals['salesman_id']] = self.env['crm.team']._get_default_team_id(user_id=vals['salesman_id'])
+                team = teams[vals['salesman_id']]
+                if team:
+                    vals['route_id'] = team.id
+                    vals['team_leader_id'] = team.user_id.id
+
+            # Add default product lines if not a concrete request
+            concrete = bool(vals.get('is_concrete'))
+            if concrete not in default_lines:
+                default_lines[concrete] = self._get_default_product_lines_values(concrete=concrete)
+            vals['product_line_ids'] = [(0, 0, dict(line_vals)) for _cmd, _id, line_vals in default_lines[concrete]]
+        requests = super().create(vals_list)
+        requests._log_state_transitions({})
+        requests._publish_dashboard_changes({})
+        return requests
+
+    def _log_state_transitions(self, old_states):
+        """
+        Append one transition row per request whose state changed.
+        :param old_states: {request_id: state} before the change; requests
+                           missing from it are logged as just created.
+        """
+        now = fields.Datetime.now()
+        vals_list = [{
+            'loading_request_id': request.id,
+            'loading_place_id': request.loading_place_id.id,
+            'from_state': old_states.get(request.id, False),
+            'to_state': request.state,
+            'user_id': self.env.uid,
+            'transition_date': now,
+        } for request in self if old_states.get(request.id) != request.state]
+        if vals_list:
+            self.env['ice.loading.state.transition'].sudo().create(vals_list)
 
     @api.model
-    def create(self, vals):
-        # Set sequence, team leader, etc.
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('ice.loading.request') or 'New'
-        if 'salesman_id' in vals and vals['salesman_id']:
-            team = self.env['crm.team']._get_default_team_id(user_id=vals['salesman_id'])
-            if team:
-                vals['route_id'] = team.id
-                vals['team_leader_id'] = team.user_id.id
+    def _reserve_sequence_names(self, count):
+        """
+        Reserve ``count`` request references with a single query on the
+        sequence. No-gap and date-range sequences fall back to next_by_code.
+        """
+        if not count:
+            return []
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', 'ice.loading.request'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence or sequence.implementation != 'standard' or sequence.use_date_range:
+            return [self.env['ir.sequence'].next_by_code('ice.loading.request') or 'New' for _i in range(count)]
+        self.env.cr.execute(SQL(
+            "SELECT nextval(%s) FROM generate_series(1, %s)", 'ir_sequence_%03d' % sequence.id, count))
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
 
-        # Add default product lines if not a concrete request
-        if vals.get('is_concrete'):
-            vals['product_line_ids'] = self._get_default_product_lines_values(concrete=True)
-        else:
-            vals['product_line_ids'] = self._get_default_product_lines_values(concrete=False)
-        request = super().create(vals)
-        return request
+    @api.model
+    @api.returns('self', lambda value: value.ids)
+    def create_daily_plan(self, vals_list):
+        """
+        Create a whole day's loading requests in one batch.
+        :param vals_list: list of value dicts, one per loading request.
+        :return: the created loading requests.
+        """
+        requests = self.with_context(mail_create_nolog=True, mail_create_nosubscribe=True).create(vals_list)
+        _logger.info("Daily plan created %s loading requests", len(requests))
+        return requests
     
     def _send_creation_notifications(self):
         """Send notifications to all required departments"""
-        groups_to_notify = [
-            'customer_management.group_collections_department',
-            'account.group_account_manager',
-            'maintenance_app.maintenance_workshop_supervisor_group',
-            'mrp.group_mrp_manager',
-            'stock.group_stock_manager',
-            'maintenance_app.maintenance_fleet_supervisor_group',
-            'sales_team.group_sale_salesman_all_leads',
-            'sales_team.group_sale_manager',
-        ]
-        
-        for group_xml_id in groups_to_notify:
-            try:
-                group = self.env.ref(group_xml_id)
-                users = group.users
-                self.message_notify(
-                    partner_ids=users.partner_id.ids,
-                    subject=f'New Loading Request: {self.name}',
-                    body=f'A new loading request has been created for car {self.car_id.license_plate} with salesman {self.salesman_id.name}.',
-                )
-            except:
-                continue
+        self.env['ice.notification.outbox']._enqueue(self, 'request_created')
     
     def _create_related_records(self):
         """Create car check request, freezer renting requests, and internal transfer"""
@@ -1018,49 +1354,22 @@ class LoadingRequest(models.Model):
         if self.state != 'ready_for_loading':
             raise UserError(_("Car keys can only be received when the request is in 'Ready for Loading' state."))
 
-        # The constraint '_check_loading_capacity' will be triggered automatically on write.
-        self.write({
-            'state': 'loading',
-            'loading_start_date': fields.Datetime.now(),
-            })
-        self.message_post(body=_("Car keys received. The car is now in the loading area."))
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        # Takes a bay right away when one is free, otherwise queues the car in
+        # 'receive_key' until the place promotes it to 'loading'.
+        reservation = self.loading_place_id._reserve_bay(self, 'loading')
+        if reservation.state == 'active':
+            self.message_post(body=_("Car keys received. The car is now in the loading area."))
+        else:
+            self.write({'state': 'receive_key'})
+            self.message_post(body=_(
+                "Car keys received. All loading bays are busy: the car is number %s in the queue, "
+                "estimated loading start %s."
+            ) % (reservation.queue_position, fields.Datetime.to_string(reservation.estimated_start_date)))
+        return self._action_refresh()
 
     def _notify_car_ready_for_dispatch(self):
-        recipients = []
-        
-        if self.salesman_id:
-            recipients.append(self.salesman_id.partner_id.id)
-        
-        if self.team_leader_id:
-            recipients.append(self.team_leader_id.partner_id.id)
-        
-        if recipients:
-            subject = _('Car Ready for Dispatch - Loading Request %s') % self.name
-            message = _("""
-            <p>Your car is now <strong>plugged and ready for dispatch</strong>:</p>
-            <ul>
-                <li><strong>Loading Request:</strong> %s</li>
-                <li><strong>Car:</strong> %s</li>
-                <li><strong>Dispatch Time:</strong> %s</li>
-                <li><strong>Loading Place:</strong> %s</li>
-            </ul>
-            <p>You can now pick up the car and start delivery.</p>
-            """) % (
-                self.name,
-                self.car_id.license_plate or self.car_id.name,
-                self.dispatch_time.strftime('%Y-%m-%d %H:%M') if self.dispatch_time else 'Not set',
-                self.loading_place_id.name
-            )
-            
-            self.message_notify(
-                partner_ids=list(set(recipients)),
-                subject=subject,
-                body=message,
-            )
+        self.env['ice.notification.outbox']._enqueue(self, 'car_ready')
+
     def _get_action_view(self, record, action_xmlid):
         self.ensure_one()
         action = self.env['ir.actions.act_window']._for_xml_id(action_xmlid)
@@ -1113,15 +1422,17 @@ class LoadingRequest(models.Model):
         }
     def action_start_second_loading(self):
         self.ensure_one()
-        # Update state to started_second_loading
-        self.write({'state': 'started_second_loading',
-                    'second_loading_start_date': fields.Datetime.now()
-                    })
-        self.message_post(body=_("Second loading started for the car."))
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        # Second loads share the bays of the place; the car stays in
+        # 'ready_for_second_loading' while queued.
+        reservation = self.loading_place_id._reserve_bay(self, 'started_second_loading')
+        if reservation.state == 'active':
+            self.message_post(body=_("Second loading started for the car."))
+        else:
+            self.message_post(body=_(
+                "All loading bays are busy: the car is number %s in the queue for second loading, "
+                "estimated start %s."
+            ) % (reservation.queue_position, fields.Datetime.to_string(reservation.estimated_start_date)))
+        return self._action_refresh()
 
     def action_second_loading_done(self):
         self.ensure_one()
@@ -1143,10 +1454,7 @@ class LoadingRequest(models.Model):
                     'second_loading_end_date': fields.Datetime.now()
                     })
         self.message_post(body=_("Second loading Loaded for the car."))
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        return self._action_refresh()
 
     @api.depends('salesman_id')
     def _compute_salesman_cash_journal(self):
@@ -1166,10 +1474,7 @@ class LoadingRequest(models.Model):
             self.state = 'done'
             self.done_date = fields.Datetime.now()
         self._create_car_daily_maintenance_requests()
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        return self._action_refresh()
         
     def _create_car_daily_maintenance_requests(self):
         car = self.car_id
@@ -1213,10 +1518,7 @@ class LoadingRequest(models.Model):
         if self.is_car_received and self.is_payment_processed and self.is_warehouse_check:
             self.state = 'done'
             self.done_date = fields.Datetime.now()
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        return self._action_refresh()
 
 
     def action_empty_warehouse(self):
@@ -1271,4 +1573,260 @@ class LoadingRequest(models.Model):
             'res_model': 'stock.picking',
             'view_mode': 'form',
             'res_id': self.return_picking_id.id,
-        }
\ No newline at end of file
+        }
+    @api.model
+    def _get_dashboard_domain(self, start_date=False, end_date=False):
+        """Dispatch-time domain shared by every dashboard counter."""
+        domain = []
+        if start_date:
+            domain.append(('dispatch_time', '>=', '%s 00:00:00' % start_date))
+        if end_date:
+            domain.append(('dispatch_time', '<=', '%s 23:59:59' % end_date))
+        return domain
+
+    @api.model
+    def _get_dashboard_cached(self, kind, args, compute):
+        """
+        Serve a dashboard aggregate from the shared TTL cache. Entries are
+        keyed by the allowed companies and the caller's record rules, so
+        users only ever share results computed under the same access scope.
+        """
+        self.check_access_rights('read')
+        self.env['fleet.vehicle'].check_access_rights('read')
+        rules = self.env['ir.rule']
+        key = (
+            kind, args, tuple(self.env.companies.ids),
+            repr(rules._compute_domain(self._name, 'read')),
+            repr(rules._compute_domain('fleet.vehicle', 'read')),
+        )
+        ttl = int(self.env['ir.config_parameter'].sudo().get_param(
+            'loading_plans_management.dashboard_cache_ttl', 15))
+        # Sequences are not transactional: this reads the latest bump of
+        # any worker, whatever the snapshot of the current transaction.
+        self.env.cr.execute(SQL("SELECT last_value FROM %s", SQL.identifier(DASHBOARD_VERSION_SEQUENCE)))
+        version = self.env.cr.fetchone()[0]
+        return dashboard_cache.get_or_compute(self.env.cr.dbname, key, ttl, compute, version)
+
+    def _invalidate_dashboard_cache(self):
+        """
+        Drop the cached dashboard aggregates of every worker once the current
+        transaction commits, by bumping the shared data version. The version
+        is bumped once per transaction however many writes call this.
+        """
+        postcommit = self.env.cr.postcommit
+        if postcommit.data.get('ice_loading_dashboard.bump_version'):
+            return
+        postcommit.data['ice_loading_dashboard.bump_version'] = True
+        registry = self.env.registry
+
+        def bump_version():
+            with registry.cursor() as cr:
+                cr.execute(SQL("SELECT nextval(%s)", DASHBOARD_VERSION_SEQUENCE))
+
+        # Bumping before the commit would let other workers cache figures
+        # computed from the data as it was before this transaction.
+        postcommit.add(bump_version)
+
+    @api.model
+    def get_dashboard_cache_stats(self):
+        """
+        Hit/miss counters of the dashboard cache, for sizing its TTL. Every
+        worker keeps its own cache and counters: these are the ones of the
+        worker serving the call. Loading managers only.
+        """
+        if not self.env.user.has_group('loading_plans_management.group_loading_application_manager'):
+            return False
+        return dashboard_cache.get_stats(self.env.cr.dbname)
+
+    @api.model
+    def get_dashboard_stats(self, start_date=False, end_date=False):
+        """
+        Compute every dashboard counter in a single pass over the loading
+        requests (plus one over the fleet) using conditional aggregates.
+        :param start_date: 'YYYY-MM-DD' lower bound on dispatch time.
+        :param end_date: 'YYYY-MM-DD' upper bound on dispatch time.
+        :return: dict keyed like the dashboard's ``stats`` state.
+        """
+        return dict(self._get_dashboard_cached(
+            'stats', (start_date, end_date),
+            lambda: self._compute_dashboard_stats(start_date, end_date),
+        ))
+
+    @api.model
+    def get_dashboard_status_distribution(self, start_date=False, end_date=False):
+        """
+        Number of non-cancelled requests per state over the dispatch day
+        range, counted under the caller's record rules.
+        :return: [{'state', 'count'}]
+        """
+        return list(self._get_dashboard_cached('status', (start_date, end_date), lambda: [
+            {'state': state, 'count': count}
+            for state, count in self._read_group(
+                self._get_dashboard_domain(start_date, end_date) + [('state', '!=', 'cancelled')],
+                ['state'], ['__count'], order='state')
+        ]))
+
+    @api.model
+    def get_dashboard_priority_distribution(self, start_date=False, end_date=False):
+        """
+        Number of open requests per priority over the dispatch day range,
+        counted under the caller's record rules.
+        :return: [{'priority', 'count'}]
+        """
+        return list(self._get_dashboard_cached('priority', (start_date, end_date), lambda: [
+            {'priority': priority, 'count': count}
+            for priority, count in self._read_group(
+                self._get_dashboard_domain(start_date, end_date) + [('state', 'not in', ['cancelled', 'done'])],
+                ['priority'], ['__count'], order='priority')
+        ]))
+
+    @api.model
+    def get_dashboard_recent_requests(self, start_date=False, end_date=False, cursor=False, limit=20):
+        """
+        One page of the dashboard's recent requests, newest first, with the
+        car capacity, loading place and salesman names resolved in the same
+        query. Pages are keyed on (create_date, id) so scrolling further
+        never rescans the rows already shown.
+        :param cursor: [create_date, id] of the last row of the previous
+                       page, or False for the first page.
+        :return: {'records': [...], 'cursor': [create_date, id] or False}
+        """
+        self.env['fleet.vehicle'].check_access_rights('read')
+        query = self._search(self._get_dashboard_domain(start_date, end_date),
+                             limit=limit, order='create_date desc, id desc')
+        if cursor:
+            query.add_where(SQL('("ice_loading_request".create_date, "ice_loading_request".id) < (%s::timestamp, %s)',
+                                cursor[0], cursor[1]))
+        # The joined values are correlated lookups by primary key: the page
+        # is limited first, so they run once per returned row only.
+        self.env.cr.execute(query.select(SQL("""
+            "ice_loading_request".id,
+            "ice_loading_request".name,
+            "ice_loading_request".state,
+            "ice_loading_request".priority,
+            "ice_loading_request".total_weight,
+            "ice_loading_request".dispatch_time,
+            "ice_loading_request".create_date,
+            "ice_loading_request".car_id,
+            (SELECT v.name FROM fleet_vehicle v WHERE v.id = "ice_loading_request".car_id),
+            (SELECT v.total_weight_capacity FROM fleet_vehicle v WHERE v.id = "ice_loading_request".car_id),
+            "ice_loading_request".salesman_id,
+            (SELECT p.name FROM res_users u JOIN res_partner p ON p.id = u.partner_id
+              WHERE u.id = "ice_loading_request".salesman_id),
+            (SELECT lp.name FROM ice_loading_place lp WHERE lp.id = "ice_loading_request".loading_place_id)
+        """)))
+        place_names = dict(self.env['ice.loading.place']._fields['name']._description_selection(self.env))
+        records = [{
+            'id': request_id,
+            'name': name,
+            'state': state,
+            'priority': priority,
+            'total_weight': total_weight or 0.0,
+            'dispatch_time': fields.Datetime.to_string(dispatch_time),
+            'car_id': car_id and {'id': car_id, 'name': car_name, 'total_weight_capacity': capacity or 0.0},
+            'salesman_id': salesman_id and [salesman_id, salesman_name],
+            'loading_place': place_names.get(place_name, False),
+            # Full precision: rows created in the same second must not be skipped.
+            'cursor': [create_date.isoformat(sep=' '), request_id],
+        } for (request_id, name, state, priority, total_weight, dispatch_time, create_date,
+               car_id, car_name, capacity, salesman_id, salesman_name, place_name) in self.env.cr.fetchall()]
+        return {
+            'records': records,
+            'cursor': records[-1]['cursor'] if len(records) == limit else False,
+        }
+
+    @api.model
+    def _compute_dashboard_stats(self, start_date, end_date):
+        query = self._search(self._get_dashboard_domain(start_date, end_date))
+        self.env.cr.execute(query.select(SQL("""
+            COUNT(*),
+            COUNT(*) FILTER (WHERE "ice_loading_request".priority = 1
+                             AND "ice_loading_request".state NOT IN ('cancelled', 'done')),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'ready_for_loading'),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state IN ('delivering', 'second_loading_delivering')),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'car_checking'),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'loading'),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'ready_for_second_loading'),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'started_second_loading'),
+            COUNT(*) FILTER (WHERE "ice_loading_request".is_warehouse_check
+                             AND "ice_loading_request".cash_payment_id IS NULL),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'empty_scrap'),
+            COUNT(*) FILTER (WHERE "ice_loading_request".is_warehouse_check
+                             AND NOT COALESCE("ice_loading_request".is_car_received, FALSE)),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'session_closed'
+                             AND NOT COALESCE("ice_loading_request".is_warehouse_check, FALSE)),
+            COUNT(*) FILTER (WHERE "ice_loading_request".state = 'ice_handled')
+        """)))
+        (today_requests, urgent_requests, ready_for_loading, delivering,
+         car_checking, loading, ready_for_second_loading, started_second_loading,
+         pending_collect_cash, empty_scrap, handle_car, empty_warehouse,
+         ice_handled) = self.env.cr.fetchone()
+
+        fleet_query = self.env['fleet.vehicle']._search([])
+        self.env.cr.execute(fleet_query.select(SQL("""
+            COUNT(*) FILTER (WHERE "fleet_vehicle".loading_status = 'available'
+                             AND "fleet_vehicle".total_weight_capacity > 1.0),
+            COUNT(*) FILTER (WHERE "fleet_vehicle".loading_status IN ('in_use', 'ready_for_loading', 'plugged'))
+        """)))
+        available_cars, busy_cars = self.env.cr.fetchone()
+
+        return {
+            'todayRequests': today_requests,
+            'urgentRequests': urgent_requests,
+            'readyForLoading': ready_for_loading,
+            'delivering': delivering,
+            'availableCars': available_cars,
+            'busyCars': busy_cars,
+            'carChecking': car_checking,
+            'loading': loading,
+            'readyForSecondLoading': ready_for_second_loading,
+            'startedSecondLoading': started_second_loading,
+            'pendingCollectCash': pending_collect_cash,
+            'emptyScrap': empty_scrap,
+            'handleCar': handle_car,
+            'emptyWarehouse': empty_warehouse,
+            'pendingReceiveCarKey': ready_for_loading,
+            'iceHandled': ice_handled,
+        }
+
+    def _get_dashboard_snapshots(self):
+        """Return {id: values} for the fields the dashboard counters depend on."""
+        return {
+            record.id: {
+                'state': record.state,
+                'priority': record.priority,
+                'dispatch_time': fields.Datetime.to_string(record.dispatch_time),
+                'loading_place_id': record.loading_place_id.id,
+                'is_warehouse_check': record.is_warehouse_check,
+                'is_car_received': record.is_car_received,
+                'has_cash_payment': bool(record.cash_payment_id),
+            }
+            for record in self
+        }
+
+    def _publish_dashboard_changes(self, before):
+        """
+        Notify open dashboards when the dashboard-relevant values of any of
+        these requests changed.
+        :param before: snapshots taken by _get_dashboard_snapshots() prior to
+                       the change; records missing from it are treated as new.
+        """
+        snapshots = self._get_dashboard_snapshots()
+        if any(before.get(record_id, False) != snapshot for record_id, snapshot in snapshots.items()):
+            self._notify_dashboard()
+
+    @api.model
+    def _notify_dashboard(self):
+        """
+        Drop the cached dashboard aggregates and ping open dashboards, once
+        per transaction however many writes call this. The ping carries no
+        record data: every client re-reads its figures through the ORM,
+        under its own record rules.
+        """
+        precommit = self.env.cr.precommit
+        if precommit.data.get('ice_loading_dashboard.notify'):
+            return
+        precommit.data['ice_loading_dashboard.notify'] = True
+        self._invalidate_dashboard_cache()
+        bus = self.env['bus.bus']
+        precommit.add(lambda: bus._sendone(DASHBOARD_CHANNEL, 'ice_loading_dashboard/invalidate', {}))
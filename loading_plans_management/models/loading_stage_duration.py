@@ -0,0 +1,155 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import create_index, create_unique_index
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+REFRESH_PARAM = 'loading_plans_management.stage_duration_last_refresh'
+# Requests committed by transactions that started before the previous run
+# carry an older write_date; re-read this much history to catch them.
+REFRESH_OVERLAP = timedelta(minutes=10)
+
+class LoadingStageDuration(models.Model):
+    _name = 'ice.loading.stage.duration'
+    _description = 'Loading Stage Duration Statistics'
+    _order = 'day desc, stage'
+
+    day = fields.Date(string='Day', required=True, readonly=True)
+    dimension = fields.Selection([
+        ('place', 'Loading Place'),
+        ('route', 'Route'),
+        ('car', 'Car'),
+    ], string='Grouped By', required=True, readonly=True)
+    loading_place_id = fields.Many2one('ice.loading.place', string='Loading Place', readonly=True)
+    route_id = fields.Many2one('crm.team', string='Route (Sales Team)', readonly=True)
+    car_id = fields.Many2one('fleet.vehicle', string='Car', readonly=True)
+    stage = fields.Selection([
+        ('car_check', 'Car Check'),
+        ('loading', 'Loading'),
+        ('plugged_to_dispatch', 'Plugged to Dispatch'),
+        ('second_loading', 'Second Loading'),
+    ], string='Stage', required=True, readonly=True)
+    stage_count = fields.Integer(string='Requests', readonly=True)
+    avg_hours = fields.Float(string='Average (Hours)', readonly=True, group_operator='avg')
+    p50_hours = fields.Float(string='Median (Hours)', readonly=True, group_operator='avg',
+                             help="Exact per day and dimension; averaged when several days are grouped.")
+    p90_hours = fields.Float(string='P90 (Hours)', readonly=True, group_operator='avg',
+                             help="Exact per day and dimension; averaged when several days are grouped.")
+
+    def init(self):
+        super().init()
+        create_index(self.env.cr, 'ice_loading_stage_duration_day_index', self._table, ['day', 'dimension'])
+
+    @api.model
+    def _cron_refresh(self):
+        """Recompute the days touched by requests changed since the last run."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        last_refresh = fields.Datetime.to_datetime(ICP.get_param(REFRESH_PARAM))
+        started = self.env.cr.now()
+        if last_refresh:
+            self.env.cr.execute(SQL(
+                "SELECT DISTINCT dispatch_time::date FROM ice_loading_request WHERE write_date > %s",
+                last_refresh - REFRESH_OVERLAP,
+            ))
+        else:
+            self.env.cr.execute(SQL("SELECT DISTINCT dispatch_time::date FROM ice_loading_request"))
+        days = {day for (day,) in self.env.cr.fetchall()}
+        # Days a request left, by a dispatch time change or a deletion.
+        days.update(self.env['ice.loading.stage.duration.dirty']._pop_days())
+        days = sorted(days)
+        self._refresh_days(days)
+        ICP.set_param(REFRESH_PARAM, fields.Datetime.to_string(started))
+        _logger.info("Refreshed loading stage durations for %s day(s)", len(days))
+
+    @api.model
+    def _refresh_days(self, days):
+        """
+        Replace the statistics of ``days`` with a fresh aggregate of the
+        request stage dates. Days are dispatch days in UTC.
+        :param days: list of dates.
+        """
+        if not days:
+            return
+        self.env.cr.execute(SQL("DELETE FROM ice_loading_stage_duration WHERE day = ANY(%s::date[])", days))
+        self.env.cr.execute(SQL("""
+            WITH stages AS (
+                SELECT
+                    r.dispatch_time::date AS day,
+                    r.loading_place_id,
+                    r.route_id,
+                    r.car_id,
+                    s.stage,
+                    EXTRACT(EPOCH FROM s.end_date - s.start_date) / 3600.0 AS hours
+                FROM ice_loading_request r
+                CROSS JOIN LATERAL (VALUES
+                    ('car_check', r.car_checking_start_date, r.car_checking_end_date),
+                    ('loading', r.loading_start_date, r.loading_end_date),
+                    ('plugged_to_dispatch', r.plugged_date, r.form_signed_date),
+                    ('second_loading', r.second_loading_start_date, r.second_loading_end_date)
+                ) AS s(stage, start_date, end_date)
+                WHERE r.dispatch_time::date = ANY(%(days)s::date[])
+                  AND r.state != 'cancelled'
+                  AND s.start_date IS NOT NULL
+                  AND s.end_date >= s.start_date
+            )
+            INSERT INTO ice_loading_stage_duration (
+                day, dimension, loading_place_id, route_id, car_id, stage,
+                stage_count, avg_hours, p50_hours, p90_hours,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT
+                day,
+                CASE WHEN GROUPING(loading_place_id) = 0 THEN 'place'
+                     WHEN GROUPING(route_id) = 0 THEN 'route'
+                     ELSE 'car' END,
+                loading_place_id, route_id, car_id, stage,
+                COUNT(*),
+                AVG(hours),
+                percentile_cont(0.5) WITHIN GROUP (ORDER BY hours),
+                percentile_cont(0.9) WITHIN GROUP (ORDER BY hours),
+                %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM stages
+            GROUP BY GROUPING SETS (
+                (day, stage, loading_place_id),
+                (day, stage, route_id),
+                (day, stage, car_id)
+            )
+        """, days=days, uid=self.env.uid))
+        self.invalidate_model()
+
+    @api.model
+    def action_rebuild(self):
+        """Recompute every day from scratch."""
+        self.env['ir.config_parameter'].sudo().set_param(REFRESH_PARAM, False)
+        self._cron_refresh()
+
+
+class LoadingStageDurationDirtyDay(models.Model):
+    _name = 'ice.loading.stage.duration.dirty'
+    _description = 'Loading Stage Duration Day to Refresh'
+    _log_access = False
+
+    day = fields.Date(string='Day', required=True, readonly=True)
+
+    def init(self):
+        super().init()
+        create_unique_index(self.env.cr, 'ice_loading_stage_duration_dirty_day_uniq', self._table, ['day'])
+
+    @api.model
+    def _mark_days(self, days):
+        """Queue ``days`` for the next statistics refresh."""
+        days = sorted(set(days))
+        if days:
+            self.env.cr.execute(SQL("""
+                INSERT INTO ice_loading_stage_duration_dirty (day)
+                SELECT UNNEST(%s::date[])
+                ON CONFLICT (day) DO NOTHING
+            """, days))
+
+    @api.model
+    def _pop_days(self):
+        """Dequeue every queued day; days queued by running transactions stay for the next run."""
+        self.env.cr.execute(SQL("DELETE FROM ice_loading_stage_duration_dirty RETURNING day"))
+        return [day for (day,) in self.env.cr.fetchall()]
@@ -0,0 +1,46 @@
+from odoo import models, fields, api, tools
+
+class LoadingStageReport(models.Model):
+    _name = 'ice.loading.stage.report'
+    _description = 'Loading Stage Duration Analysis'
+    _auto = False
+    _order = 'start_date desc'
+
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', readonly=True)
+    loading_place_id = fields.Many2one('ice.loading.place', string='Loading Place', readonly=True)
+    route_id = fields.Many2one('crm.team', string='Route (Sales Team)', readonly=True)
+    car_id = fields.Many2one('fleet.vehicle', string='Car', readonly=True)
+    salesman_id = fields.Many2one('res.users', string='Salesman', readonly=True)
+    state = fields.Selection(selection='_selection_state', string='Stage', readonly=True)
+    user_id = fields.Many2one('res.users', string='Entered By', readonly=True)
+    start_date = fields.Datetime(string='Stage Start', readonly=True)
+    end_date = fields.Datetime(string='Stage End', readonly=True)
+    duration_hours = fields.Float(string='Duration (Hours)', readonly=True, group_operator='avg')
+
+    @api.model
+    def _selection_state(self):
+        return self.env['ice.loading.request']._fields['state'].selection
+
+    def init(self):
+        # Each transition opens a stage that lasts until the request's next
+        # transition; stages still in progress have no end date.
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    t.id,
+                    t.loading_request_id,
+                    COALESCE(t.loading_place_id, r.loading_place_id) AS loading_place_id,
+                    r.route_id,
+                    r.car_id,
+                    r.salesman_id,
+                    t.to_state AS state,
+                    t.user_id,
+                    t.transition_date AS start_date,
+                    LEAD(t.transition_date) OVER w AS end_date,
+                    EXTRACT(EPOCH FROM LEAD(t.transition_date) OVER w - t.transition_date) / 3600.0 AS duration_hours
+                FROM ice_loading_state_transition t
+                JOIN ice_loading_request r ON r.id = t.loading_request_id
+                WINDOW w AS (PARTITION BY t.loading_request_id ORDER BY t.transition_date, t.id)
+            )
+        """ % self._table)
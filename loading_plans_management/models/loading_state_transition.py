@@ -0,0 +1,32 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+
+class LoadingStateTransition(models.Model):
+    _name = 'ice.loading.state.transition'
+    _description = 'Loading Request State Transition'
+    _order = 'transition_date desc, id desc'
+
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True, readonly=True, ondelete='cascade')
+    loading_place_id = fields.Many2one('ice.loading.place', string='Loading Place', readonly=True)
+    from_state = fields.Selection(selection='_selection_state', string='From', readonly=True)
+    to_state = fields.Selection(selection='_selection_state', string='To', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Changed By', required=True, readonly=True, default=lambda self: self.env.user)
+    transition_date = fields.Datetime(string='Date', required=True, readonly=True, default=fields.Datetime.now)
+
+    def init(self):
+        super().init()
+        # Stage durations are computed per request in transition order.
+        create_index(self.env.cr, 'ice_loading_state_transition_request_date_index', self._table,
+                     ['loading_request_id', 'transition_date', 'id'])
+        create_index(self.env.cr, 'ice_loading_state_transition_date_index', self._table, ['transition_date'])
+
+    @api.model
+    def _selection_state(self):
+        return self.env['ice.loading.request']._fields['state'].selection
+
+    def write(self, vals):
+        raise UserError(_("State transitions are an audit log and cannot be modified."))
+
+    def unlink(self):
+        raise UserError(_("State transitions are an audit log and cannot be deleted."))
@@ -0,0 +1,245 @@
+from odoo import models, fields, api, _, Command
+from odoo.tools import SQL
+from collections import defaultdict
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Departments told about every new loading request.
+CREATION_GROUPS = [
+    'customer_management.group_collections_department',
+    'account.group_account_manager',
+    'maintenance_app.maintenance_workshop_supervisor_group',
+    'mrp.group_mrp_manager',
+    'stock.group_stock_manager',
+    'maintenance_app.maintenance_fleet_supervisor_group',
+    'sales_team.group_sale_salesman_all_leads',
+    'sales_team.group_sale_manager',
+]
+# Events delivered as soon as possible rather than with the next digest.
+URGENT_EVENTS = {'car_ready'}
+FORM_MESSAGES = {
+    # 'freezer_release': 'Freezer Release Form has been signed and uploaded',
+    'loading_form': 'Loading Form has been signed and uploaded',
+}
+# Retry n waits BACKOFF_BASE * 2 ** (n - 1): 1, 2, 4, 8... minutes.
+BACKOFF_BASE = timedelta(minutes=1)
+
+class NotificationOutbox(models.Model):
+    _name = 'ice.notification.outbox'
+    _description = 'Loading Notification Outbox'
+    _order = 'event_date, id'
+
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True, readonly=True, ondelete='cascade')
+    event_type = fields.Selection([
+        ('request_created', 'Request Created'),
+        ('form_uploaded', 'Form Uploaded'),
+        ('car_ready', 'Car Ready for Dispatch'),
+    ], string='Event', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Triggered By', required=True, readonly=True, default=lambda self: self.env.user)
+    event_date = fields.Datetime(string='Date', required=True, readonly=True, default=fields.Datetime.now)
+    form_type = fields.Char(string='Form', readonly=True)
+    request_state = fields.Selection(selection='_selection_state', string='Request Status', readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='Status', required=True, default='pending', readonly=True, index=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    max_attempts = fields.Integer(string='Max Attempts', default=5, readonly=True)
+    next_attempt_date = fields.Datetime(string='Next Attempt', required=True, readonly=True, default=fields.Datetime.now)
+    retry_partner_ids = fields.Many2many('res.partner', string='Recipients To Retry', readonly=True,
+                                         help="Recipients the last attempt failed to notify. Retries only go to them.")
+    sent_date = fields.Datetime(string='Sent On', readonly=True)
+    last_error = fields.Text(string='Last Error', readonly=True)
+
+    @api.model
+    def _selection_state(self):
+        return self.env['ice.loading.request']._fields['state'].selection
+
+    @api.model
+    def _enqueue(self, requests, event_type, **values):
+        """
+        Record a notification event for every request. Recipients, subject and
+        body are resolved by the digest cron, so the caller pays for one
+        insert only. Time-sensitive events wake the cron right away instead
+        of waiting for the next digest.
+        """
+        events = self.sudo().create([{
+            'loading_request_id': request.id,
+            'event_type': event_type,
+            'user_id': self.env.uid,
+            'request_state': request.state,
+            **values,
+        } for request in requests])
+        if events and event_type in URGENT_EVENTS:
+            self.env.ref('loading_plans_management.ir_cron_send_loading_notifications').sudo()._trigger()
+        return events
+
+    @api.model
+    def _cron_send(self, limit=500):
+        """
+        Deliver the pending events. Each recipient gets one notification:
+        the event itself when it is the only one waiting for them, a digest
+        of all their events otherwise. Recipients waiting for the same events
+        are notified together. Failed deliveries are retried with a backoff,
+        to the recipients they missed only.
+        """
+        self.env.cr.execute(SQL("""
+            SELECT id FROM ice_notification_outbox
+             WHERE state = 'pending' AND next_attempt_date <= %s
+          ORDER BY event_date, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, fields.Datetime.now(), limit))
+        events = self.browse(row[0] for row in self.env.cr.fetchall())
+        if not events:
+            return
+
+        group_partners = {}
+        events_by_partner = defaultdict(lambda: self.browse())
+        for event in events:
+            for partner in event.retry_partner_ids or event._get_recipients(group_partners):
+                events_by_partner[partner] |= event
+        partners_by_events = defaultdict(lambda: self.env['res.partner'])
+        for partner, partner_events in events_by_partner.items():
+            partners_by_events[partner_events] |= partner
+
+        failed = defaultdict(list)
+        missed_partners = defaultdict(lambda: self.env['res.partner'])
+        for partner_events, partners in partners_by_events.items():
+            try:
+                with self.env.cr.savepoint():
+                    partner_events._notify(partners)
+            except Exception as e:
+                self.env.invalidate_all()
+                _logger.exception("Could not send %s loading notification(s) to %s", len(partner_events), partners.ids)
+                for event in partner_events:
+                    failed[event].append(str(e))
+                    missed_partners[event] |= partners
+
+        (events - self.browse([event.id for event in failed])).write({
+            'state': 'sent',
+            'sent_date': fields.Datetime.now(),
+            'retry_partner_ids': [Command.clear()],
+            'last_error': False,
+        })
+        for event, errors in failed.items():
+            event._schedule_retry('\n'.join(errors), missed_partners[event])
+        _logger.info("Sent %s loading notification(s) to %s recipient(s), %s failed",
+                     len(events) - len(failed), len(events_by_partner), len(failed))
+        if len(events) == limit:
+            # More events are waiting: run again right after this batch commits.
+            self.env.ref('loading_plans_management.ir_cron_send_loading_notifications')._trigger()
+
+    def _schedule_retry(self, error, partners):
+        """
+        Queue the event again for ``partners``, the recipients it could not
+        reach, or give up once it has used all its attempts.
+        """
+        self.ensure_one()
+        attempts = self.attempts + 1
+        values = {'attempts': attempts, 'last_error': error, 'retry_partner_ids': [Command.set(partners.ids)]}
+        if attempts >= self.max_attempts:
+            self.write(dict(values, state='failed'))
+            _logger.warning("Giving up sending loading notification %s of %s after %s attempts: %s",
+                            self.id, self.loading_request_id.name, attempts, error)
+            return
+        self.write(dict(values, next_attempt_date=fields.Datetime.now() + BACKOFF_BASE * 2 ** (attempts - 1)))
+
+    def action_retry(self):
+        """Put failed events back in the queue for an immediate attempt."""
+        self.filtered(lambda e: e.state == 'failed').write({
+            'state': 'pending',
+            'attempts': 0,
+            'next_attempt_date': fields.Datetime.now(),
+        })
+        self.env.ref('loading_plans_management.ir_cron_send_loading_notifications').sudo()._trigger()
+
+    def _get_recipients(self, group_partners):
+        """
+        Partners to notify of this event.
+        :param group_partners: {group xml id: res.partner}, filled on demand
+                               so every group is resolved once per run.
+        """
+        self.ensure_one()
+        request = self.loading_request_id
+        partners = self.env['res.partner']
+        if self.event_type == 'request_created':
+            group_xmlids = CREATION_GROUPS
+        else:
+            partners = request.salesman_id.partner_id | request.team_leader_id.partner_id
+            group_xmlids = ['loading_plans_management.group_sales_supervisor'] if self.event_type == 'form_uploaded' else []
+        for group_xmlid in group_xmlids:
+            if group_xmlid not in group_partners:
+                group = self.env.ref(group_xmlid, raise_if_not_found=False)
+                group_partners[group_xmlid] = group.users.partner_id if group else self.env['res.partner']
+            partners |= group_partners[group_xmlid]
+        return partners
+
+    def _notify(self, partners):
+        """Notify ``partners`` of these events: the event itself when alone, a digest otherwise."""
+        if len(self) == 1:
+            subject, body = self._render()
+            self.loading_request_id.message_notify(
+                partner_ids=partners.ids, subject=subject, body=body, author_id=self.user_id.partner_id.id)
+            return
+        parts = []
+        for event in self:
+            subject, body = event._render()
+            parts.append(f"<h4>{subject}</h4>{body}")
+        self.env['mail.thread'].message_notify(
+            partner_ids=partners.ids,
+            subject=_('Loading Requests: %s updates') % len(self),
+            body=''.join(parts),
+        )
+
+    def _render(self):
+        """:return: (subject, body) of the event."""
+        self.ensure_one()
+        request = self.loading_request_id
+        if self.event_type == 'request_created':
+            return (
+                f'New Loading Request: {request.name}',
+                f'A new loading request has been created for car {request.car_id.license_plate} with salesman {request.salesman_id.name}.',
+            )
+        if self.event_type == 'form_uploaded':
+            form_message = FORM_MESSAGES.get(self.form_type, 'Form')
+            subject = _('%s for Loading Request %s') % (form_message, request.name)
+            body = _("""
+            <p>The <strong>%s</strong> has been signed and uploaded for loading request <strong>%s</strong>:</p>
+            <ul>
+                <li><strong>Car:</strong> %s</li>
+                <li><strong>Salesman:</strong> %s</li>
+                <li><strong>Uploaded by:</strong> %s</li>
+                <li><strong>Upload Date:</strong> %s</li>
+                <li><strong>Status:</strong> %s</li>
+            </ul>
+            """) % (
+                form_message,
+                request.name,
+                request.car_id.license_plate or request.car_id.name,
+                request.salesman_id.name,
+                self.user_id.name,
+                self.event_date.strftime('%Y-%m-%d %H:%M'),
+                dict(self._fields['request_state']._description_selection(self.env)).get(self.request_state, ''),
+            )
+            return subject, body
+        subject = _('Car Ready for Dispatch - Loading Request %s') % request.name
+        body = _("""
+        <p>Your car is now <strong>plugged and ready for dispatch</strong>:</p>
+        <ul>
+            <li><strong>Loading Request:</strong> %s</li>
+            <li><strong>Car:</strong> %s</li>
+            <li><strong>Dispatch Time:</strong> %s</li>
+            <li><strong>Loading Place:</strong> %s</li>
+        </ul>
+        <p>You can now pick up the car and start delivery.</p>
+        """) % (
+            request.name,
+            request.car_id.license_plate or request.car_id.name,
+            request.dispatch_time.strftime('%Y-%m-%d %H:%M') if request.dispatch_time else 'Not set',
+            request.loading_place_id.name,
+        )
+        return subject, body
@@ -0,0 +1,108 @@
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+from datetime import timedelta
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+# Retry n waits BACKOFF_BASE * 2 ** (n - 1): 1, 2, 4, 8... minutes.
+BACKOFF_BASE = timedelta(minutes=1)
+
+class PickingValidationJob(models.Model):
+    _name = 'ice.picking.validation.job'
+    _description = 'Picking Validation Job'
+    _order = 'id desc'
+
+    picking_id = fields.Many2one('stock.picking', string='Transfer', required=True, readonly=True, ondelete='cascade')
+    loading_request_id = fields.Many2one(related='picking_id.loading_request_id', store=True, index=True, string='Loading Request')
+    user_id = fields.Many2one('res.users', string='Requested By', required=True, readonly=True, default=lambda self: self.env.user)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', required=True, default='pending', readonly=True, index=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    max_attempts = fields.Integer(string='Max Attempts', default=5, readonly=True)
+    next_attempt_date = fields.Datetime(string='Next Attempt', required=True, readonly=True, default=fields.Datetime.now)
+    done_date = fields.Datetime(string='Validated On', readonly=True)
+    last_error = fields.Text(string='Last Error', readonly=True)
+
+    @api.model
+    def _enqueue(self, pickings):
+        """
+        Queue ``pickings`` for validation in the background and wake the
+        worker cron. Pickings already queued are not queued twice.
+        """
+        Jobs = self.sudo()
+        queued = Jobs.search([('picking_id', 'in', pickings.ids), ('state', '=', 'pending')]).picking_id
+        jobs = Jobs.create([{'picking_id': picking.id, 'user_id': self.env.uid} for picking in pickings - queued])
+        if jobs:
+            self.env.ref('loading_plans_management.ir_cron_process_picking_validation_jobs').sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process(self, limit=50):
+        """
+        Validate due pickings one job at a time. Each job is locked with
+        SKIP LOCKED so several workers can share the queue, and committed on
+        its own so a slow or failing picking does not hold the others back.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        for _i in range(limit):
+            self.env.cr.execute(SQL("""
+                SELECT id FROM ice_picking_validation_job
+                 WHERE state = 'pending' AND next_attempt_date <= %s
+              ORDER BY next_attempt_date, id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """, fields.Datetime.now()))
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            self.browse(row[0])._process()
+            if auto_commit:
+                self.env.cr.commit()
+
+    def _process(self):
+        self.ensure_one()
+        picking = self.picking_id.with_user(self.user_id).with_company(self.picking_id.company_id)
+        try:
+            with self.env.cr.savepoint():
+                if picking.state not in ('done', 'cancel'):
+                    picking.button_validate()
+                if picking.state != 'done':
+                    raise ValueError(_("Transfer %s could not be validated without user confirmation (state: %s).")
+                                     % (picking.name, picking.state))
+        except Exception as e:
+            # The savepoint was rolled back; drop what the cache kept from it.
+            self.env.invalidate_all()
+            self._schedule_retry(str(e))
+            return
+        self.write({'state': 'done', 'done_date': fields.Datetime.now(), 'attempts': self.attempts + 1, 'last_error': False})
+        _logger.info("Validated transfer %s in the background", picking.name)
+
+    def _schedule_retry(self, error):
+        attempts = self.attempts + 1
+        if attempts >= self.max_attempts:
+            self.write({'state': 'failed', 'attempts': attempts, 'last_error': error})
+            _logger.warning("Giving up validating transfer %s after %s attempts: %s", self.picking_id.name, attempts, error)
+            if self.loading_request_id:
+                self.loading_request_id.message_post(body=_(
+                    "Transfer %s could not be validated automatically: %s") % (self.picking_id.name, error))
+            return
+        self.write({
+            'attempts': attempts,
+            'last_error': error,
+            'next_attempt_date': fields.Datetime.now() + BACKOFF_BASE * 2 ** (attempts - 1),
+        })
+        _logger.info("Transfer %s validation failed (attempt %s), retrying later: %s", self.picking_id.name, attempts, error)
+
+    def action_retry(self):
+        """Put failed jobs back in the queue for an immediate attempt."""
+        self.filtered(lambda j: j.state == 'failed').write({
+            'state': 'pending',
+            'attempts': 0,
+            'next_attempt_date': fields.Datetime.now(),
+        })
+        self.env.ref('loading_plans_management.ir_cron_process_picking_validation_jobs').sudo()._trigger()
@@ -1,4 +1,14 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+
+# Car capacity field (in bags/pieces/baskets) and product pieces-per-unit
+# field, per ice product type.
+ICE_CAPACITY_FIELDS = {
+    '4kg': ('ice_4kg_capacity', 'pcs_per_bag'),
+    '25kg': ('ice_25kg_capacity', 'pcs_for_concrete'),
+    'cup': ('ice_cup_capacity', 'pcs_per_basket'),
+}
+# Product fields that feed the cached vehicle capacity matrix.
+CAPACITY_PRODUCT_FIELDS = {'ice_product_type', 'weight', 'pcs_per_bag', 'pcs_for_concrete', 'pcs_per_basket', 'active'}
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
@@ -24,4 +34,79 @@ class ProductTemplate(models.Model):
         string='Pieces per Basket', 
         default=24, 
         help="How many individual pieces are in one basket (for ice cups)."
-    )
\ No newline at end of file
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        templates = super().create(vals_list)
+        if any(vals.get('ice_product_type') for vals in vals_list):
+            self.env.registry.clear_cache()
+        return templates
+
+    def write(self, vals):
+        # Changing the type or archiving may change which product is the
+        # reference of a type; other fields only matter on the references.
+        affected = False
+        if CAPACITY_PRODUCT_FIELDS.intersection(vals):
+            if {'ice_product_type', 'active'}.intersection(vals):
+                affected = any(self.mapped('ice_product_type'))
+            else:
+                affected = self._is_ice_reference()
+        res = super().write(vals)
+        if affected or vals.get('ice_product_type'):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        clear = self._is_ice_reference()
+        res = super().unlink()
+        if clear:
+            self.env.registry.clear_cache()
+        return res
+
+    def _is_ice_reference(self):
+        """Whether any of these templates is the reference product of its ice product type."""
+        references = {
+            ice_type: self.sudo().search([('ice_product_type', '=', ice_type)], limit=1).id
+            for ice_type in set(self.filtered('ice_product_type').mapped('ice_product_type'))
+        }
+        return any(references[template.ice_product_type] == template.id
+                   for template in self if template.ice_product_type)
+
+    @api.model
+    @tools.ormcache()
+    def _get_ice_product_parameters(self):
+        """
+        Weight and pieces per unit of the reference product of each ice
+        product type, as {ice_product_type: (weight, pcs_per_unit)}.
+        """
+        parameters = {}
+        for ice_type, (_capacity_field, pcs_field) in ICE_CAPACITY_FIELDS.items():
+            product = self.sudo().search([('ice_product_type', '=', ice_type)], limit=1)
+            if product:
+                parameters[ice_type] = (product.weight, product[pcs_field])
+        return parameters
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    def write(self, vals):
+        # The weight is stored on the variant.
+        clear = 'weight' in vals and self.product_tmpl_id._is_ice_reference()
+        res = super().write(vals)
+        if clear:
+            self.env.registry.clear_cache()
+        return res
+
+    def _get_ice_pcs_per_unit(self):
+        """
+        Pieces in one user-facing unit: a bag of 4kg, a basket of cups, else
+        one piece. Same defaults as the product lines' quantity_in_pcs.
+        """
+        self.ensure_one()
+        if self.ice_product_type == '4kg':
+            return self.pcs_per_bag or 8
+        if self.ice_product_type == 'cup':
+            return self.pcs_per_basket or 24
+        return 1
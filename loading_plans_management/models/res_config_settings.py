@@ -29,6 +29,11 @@ class IceSalesConfig(models.Model):
     scrap_location_id = fields.Many2one('stock.location', string='Scrap Location',
                                           domain=[('scrap_location', '=', True)],
                                           help="Location where scrapped items are placed")
+    ice_notify_request_creation = fields.Boolean(
+        string='Notify Departments of New Requests',
+        help="Notify the collections, accounting, maintenance, manufacturing, stock and sales departments "
+             "of every confirmed loading request."
+    )
     
 
 class ResConfigSettings(models.TransientModel):
@@ -60,4 +65,8 @@ class ResConfigSettings(models.TransientModel):
         related='company_id.scrap_location_id', 
         readonly=False,
         default_model='res.company'
-    )
\ No newline at end of file
+    )
+    ice_notify_request_creation = fields.Boolean(
+        related='company_id.ice_notify_request_creation',
+        readonly=False
+    )
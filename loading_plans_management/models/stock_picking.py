@@ -4,11 +4,48 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+class StockLocation(models.Model):
+    _inherit = 'stock.location'
+
+    is_van_location = fields.Boolean(string='Van Location', readonly=True, copy=False,
+                                     help="The van inventory ledger keeps the stock of this location.")
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    def _action_done(self, cancel_backorder=False):
+        # Covers validated pickings, sale deliveries and scraps alike.
+        moves = super()._action_done(cancel_backorder=cancel_backorder)
+        self.env['ice.driver.session.ledger']._post_move_lines(moves.move_line_ids)
+        return moves
+
+
 class StockScrap(models.Model):
     _inherit = 'stock.scrap'
 
     loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', readonly=True, copy=False, ondelete='set null')
 
+    def _do_scrap_batch(self):
+        """
+        Validate the scraps together: their moves are created in one batch and
+        done in one ``_action_done``, so the quants are updated in a single
+        pass instead of once per scrap. Availability is not checked here; the
+        callers compare the quantities with the van stock beforehand.
+        """
+        if not self:
+            return True
+        self._check_company()
+        for scrap in self:
+            scrap.name = self.env['ir.sequence'].next_by_code('stock.scrap') or _('New')
+        moves = self.env['stock.move'].create([scrap._prepare_move_values() for scrap in self])
+        moves.with_context(is_scrap=True)._action_done()
+        self.write({'state': 'done', 'date_done': fields.Datetime.now()})
+        replenish = self.filtered('should_replenish')
+        if replenish:
+            replenish.do_replenish()
+        return True
+
 
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
@@ -21,13 +58,15 @@ class StockPicking(models.Model):
     def button_validate(self):
         # First, call the original validation logic
         res = super(StockPicking, self).button_validate()
-        if self.loading_request_id:
-            if self.is_second_loading and self.loading_request_id.state == 'started_second_loading':
-                self.loading_request_id.write({'state': 'second_loading_delivering'})
-                _logger.info("Second loading transfer validated. Updated request %s to 'second_loading_done'", self.loading_request_id.name)
-            elif not self.is_second_loading and self.loading_request_id.state == 'loading':
-                self.loading_request_id.write({'state': 'ice_handled'})
-                _logger.info("First loading transfer validated. Updated request %s to 'ice_handled'", self.loading_request_id.name)
+        # Pickings may be validated in batches, e.g. the return transfers of
+        # several vans.
+        for picking in self.filtered('loading_request_id'):
+            request = picking.loading_request_id
+            if picking.is_second_loading and request.state == 'started_second_loading':
+                request.write({'state': 'second_loading_delivering'})
+                _logger.info("Second loading transfer validated. Updated request %s to 'second_loading_done'", request.name)
+            elif not picking.is_second_loading and request.state == 'loading':
+                request.write({'state': 'ice_handled'})
+                _logger.info("First loading transfer validated. Updated request %s to 'ice_handled'", request.name)
 
         return res
-
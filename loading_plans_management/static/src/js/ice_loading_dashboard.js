@@ -37,6 +37,12 @@ WeightProgressBar.props = {
 registry.category("components").add("WeightProgressBar", WeightProgressBar);
 
 
+// Must match DASHBOARD_CHANNEL in models/loading_request.py
+const DASHBOARD_CHANNEL = "ice_loading_dashboard";
+const RECENT_REQUESTS_PAGE_SIZE = 20;
+// Delay (ms) before reloading after a ping, to batch bursts of changes.
+const RELOAD_DELAY = 1000;
+
 /**
  * Ice Loading Management Dashboard Component
  */
@@ -47,6 +53,7 @@ export class IceLoadingDashboard extends Component {
         this.orm = useService("orm");
         this.action = useService("action");
         this.notification = useService("notification");
+        this.busService = useService("bus_service");
         
         this.state = useState({
             stats: {
@@ -68,11 +75,13 @@ export class IceLoadingDashboard extends Component {
                 iceHandled: 0,
             },
             recentRequests: [],
+            cacheStats: false,
+            recentCursor: false,
+            loadingMore: false,
             statusDistribution: [],
             priorityDistribution: [],
             loading: true,
             error: null,
-            refreshInterval: null,
             startDate: new Date().toISOString().slice(0, 10),
             endDate: new Date().toISOString().slice(0, 10),
         });
@@ -81,31 +90,54 @@ export class IceLoadingDashboard extends Component {
             await this.loadDashboardData();
         });
 
+        // Figures are reloaded when the server pings that they changed
+        // instead of polling, and when the bus connection is re-established.
+        this.onDashboardInvalidated = this.onDashboardInvalidated.bind(this);
+        this.onBusReconnect = this.onBusReconnect.bind(this);
+
         onMounted(() => {
-            this.state.refreshInterval = setInterval(() => {
-                this.loadDashboardData();
-            }, 30000);
+            this.busService.addChannel(DASHBOARD_CHANNEL);
+            this.busService.subscribe("ice_loading_dashboard/invalidate", this.onDashboardInvalidated);
+            this.busService.addEventListener("reconnect", this.onBusReconnect);
         });
 
         onWillUnmount(() => {
             this.isMounted = false;
-            if (this.state.refreshInterval) {
-                clearInterval(this.state.refreshInterval);
-            }
+            clearTimeout(this.reloadTimeout);
+            this.busService.unsubscribe("ice_loading_dashboard/invalidate", this.onDashboardInvalidated);
+            this.busService.removeEventListener("reconnect", this.onBusReconnect);
+            this.busService.deleteChannel(DASHBOARD_CHANNEL);
         });
     }
 
-    async loadDashboardData() {
+    onBusReconnect() {
+        this.loadDashboardData();
+    }
+
+    /**
+     * The server only pings that the figures changed; re-read them through
+     * the ORM so they stay scoped to the user's record rules. Bursts of
+     * pings during the morning rush collapse into a single reload.
+     */
+    onDashboardInvalidated() {
+        if (!this.isMounted) return;
+        clearTimeout(this.reloadTimeout);
+        this.reloadTimeout = setTimeout(() => this.loadDashboardData({ silent: true }), RELOAD_DELAY);
+    }
+
+    async loadDashboardData({ silent = false } = {}) {
         try {
             if (!this.isMounted) return;
-            this.state.loading = true;
+            // Silent reloads keep the current figures on screen meanwhile.
+            if (!silent) this.state.loading = true;
             this.state.error = null;
 
-            const [stats, recentRequests, statusDist, priorityDist] = await Promise.all([
+            const [stats, recentRequests, statusDist, priorityDist, cacheStats] = await Promise.all([
                 this.loadStatistics(),
                 this.loadRecentRequests(),
                 this.loadStatusDistribution(),
-                this.loadPriorityDistribution()
+                this.loadPriorityDistribution(),
+                this.loadCacheStats()
             ]);
 
             if (!this.isMounted) return;
@@ -114,6 +146,7 @@ export class IceLoadingDashboard extends Component {
             this.state.recentRequests = recentRequests;
             this.state.statusDistribution = statusDist;
             this.state.priorityDistribution = priorityDist;
+            this.state.cacheStats = cacheStats;
 
         } catch (error) {
             if (!this.isMounted) return;
@@ -140,111 +173,80 @@ export class IceLoadingDashboard extends Component {
         return domain;
     }
 
-    async loadStatistics() {
-        const [
-            todayRequests, urgentRequests, readyForLoading, delivering,
-            availableCars, busyCars, carChecking, loading,
-            readyForSecondLoading, startedSecondLoading,
-            pendingCollectCash, emptyScrap, handleCar, emptyWarehouse,
-            pendingReceiveCarKey, iceHandled,
-        ] = await Promise.all([
-            this.orm.searchCount("ice.loading.request", this.domain),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['priority', '=', 1], ['state', 'not in', ['cancelled', 'done']]]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'ready_for_loading']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', 'in', ['delivering', 'second_loading_delivering']]]),
-            this.orm.searchCount("fleet.vehicle", [['loading_status', '=', 'available'], ['total_weight_capacity', '>', 1.00]]),
-            this.orm.searchCount("fleet.vehicle", [['loading_status', 'in', ['in_use', 'ready_for_loading', 'plugged']]]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'car_checking']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'loading']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'ready_for_second_loading']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'started_second_loading']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['is_warehouse_check', '=', true], ['cash_payment_id', '=', false]]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'empty_scrap']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['is_warehouse_check', '=', true], ['is_car_received', '=', false]]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'session_closed'],['is_warehouse_check', '=', false]]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'ready_for_loading']]),
-            this.orm.searchCount("ice.loading.request", [...this.domain, ['state', '=', 'ice_handled']]),
-        ]);
-
-        return {
-            todayRequests, urgentRequests, readyForLoading, delivering,
-            availableCars, busyCars, carChecking, loading,
-            readyForSecondLoading, startedSecondLoading,
-            pendingCollectCash, emptyScrap, handleCar, emptyWarehouse,
-            pendingReceiveCarKey, iceHandled,
-        };
+    /**
+     * Cache counters of the server worker that answered, for managers only
+     * (false otherwise). Each worker counts its own hits and misses.
+     */
+    async loadCacheStats() {
+        return await this.orm.call("ice.loading.request", "get_dashboard_cache_stats", []);
     }
 
-    async loadRecentRequests() {
-        // Step 1: Fetch loading requests without the problematic field
-        const requests = await this.orm.searchRead(
-            "ice.loading.request", this.domain,
-            ["name", "car_id", "salesman_id", "state", "dispatch_time", "priority", "total_weight"],
-            { order: "create_date desc", limit: 10 }
+    async loadStatistics() {
+        // All counters are computed server-side in a single aggregate query.
+        const { startDate, endDate } = this.state;
+        return await this.orm.call(
+            "ice.loading.request", "get_dashboard_stats",
+            [startDate || false, endDate || false]
         );
+    }
 
-        if (!requests.length) {
-            return [];
-        }
-
-        // Step 2: Collect all unique car IDs that are not null
-        const carIds = [...new Set(requests.map(req => req.car_id ? req.car_id[0] : null).filter(id => id))];
+    /**
+     * Fetch one page of recent requests, already joined with car capacity,
+     * loading place and salesman names. Pass the cursor returned by the
+     * previous call to get the next page.
+     */
+    async loadRecentRequests(cursor = false) {
+        const { startDate, endDate } = this.state;
+        const page = await this.orm.call(
+            "ice.loading.request", "get_dashboard_recent_requests",
+            [startDate || false, endDate || false, cursor, RECENT_REQUESTS_PAGE_SIZE]
+        );
+        this.state.recentCursor = page.cursor;
+        return page.records.map(request => ({
+            ...request,
+            dispatch_time_formatted: this.formatDateTime(request.dispatch_time),
+            priority_class: this.getPriorityClass(request.priority),
+            state_class: this.getStateClass(request.state),
+            state: this.getStateLabel(request.state)
+        }));
+    }
 
-        // Step 3: If there are cars, fetch their capacities
-        let carCapacities = {};
-        if (carIds.length > 0) {
-            const carData = await this.orm.read("fleet.vehicle", carIds, ["total_weight_capacity"]);
-            // Create a map of car_id -> capacity
-            carData.forEach(car => {
-                carCapacities[car.id] = car.total_weight_capacity;
-            });
+    async onLoadMoreRecentRequests() {
+        if (!this.state.recentCursor || this.state.loadingMore) return;
+        this.state.loadingMore = true;
+        try {
+            const requests = await this.loadRecentRequests(this.state.recentCursor);
+            if (!this.isMounted) return;
+            const shown = new Set(this.state.recentRequests.map(request => request.id));
+            this.state.recentRequests.push(...requests.filter(request => !shown.has(request.id)));
+        } finally {
+            if (this.isMounted) this.state.loadingMore = false;
         }
-
-        // Step 4: Map the results, merging the capacity data
-        return requests.map(request => {
-            const carId = request.car_id ? request.car_id[0] : null;
-            const carData = request.car_id ? {
-                id: carId,
-                name: request.car_id[1],
-                total_weight_capacity: carCapacities[carId] || 0
-            } : false;
-
-            return {
-                ...request,
-                car_id: carData,
-                dispatch_time_formatted: this.formatDateTime(request.dispatch_time),
-                priority_class: this.getPriorityClass(request.priority),
-                state_class: this.getStateClass(request.state),
-                state: this.getStateLabel(request.state)
-            };
-        });
     }
 
     async loadStatusDistribution() {
-        const distribution = await this.orm.readGroup(
-            "ice.loading.request",
-            [['state', 'not in', ['cancelled']]],
-            ['state'],
-            ['state']
+        const { startDate, endDate } = this.state;
+        const distribution = await this.orm.call(
+            "ice.loading.request", "get_dashboard_status_distribution",
+            [startDate || false, endDate || false]
         );
         return distribution.map(item => ({
             state: item.state,
-            count: item.state_count,
+            count: item.count,
             label: this.getStateLabel(item.state),
             color: this.getStateColor(item.state)
         }));
     }
 
     async loadPriorityDistribution() {
-        const distribution = await this.orm.readGroup(
-            "ice.loading.request",
-            [['state', 'not in', ['cancelled', 'done']]],
-            ['priority'],
-            ['priority']
+        const { startDate, endDate } = this.state;
+        const distribution = await this.orm.call(
+            "ice.loading.request", "get_dashboard_priority_distribution",
+            [startDate || false, endDate || false]
         );
         return distribution.map(item => ({
             priority: item.priority,
-            count: item.priority_count,
+            count: item.count,
             label: this.getPriorityLabel(item.priority),
             color: this.getPriorityColor(item.priority)
         }));
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestBulkWarehouseReturn(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.loading_location = warehouse.lot_stock_id
+        cls.env.company.scrap_location_id = cls.env['stock.location'].search([
+            ('scrap_location', '=', True), ('company_id', 'in', [cls.env.company.id, False]),
+        ], limit=1)
+        cls.place = cls.env['ice.loading.place'].create({
+            'name': 'dammam',
+            'loading_location_id': cls.loading_location.id,
+        })
+        brand = cls.env['fleet.vehicle.model.brand'].create({'name': 'Ice Trucks'})
+        model = cls.env['fleet.vehicle.model'].create({'name': 'Reefer', 'brand_id': brand.id})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Ice Bag 4kg',
+            'detailed_type': 'product',
+            'ice_product_type': '4kg',
+            'pcs_per_bag': 8,
+        })
+
+        cls.requests = cls.env['ice.loading.request']
+        cls.van_locations = cls.env['stock.location']
+        for index in range(2):
+            van_location = cls.env['stock.location'].create({
+                'name': f'Van {index}',
+                'usage': 'internal',
+                'location_id': warehouse.view_location_id.id,
+            })
+            salesman = cls.env['res.users'].create({
+                'name': f'Salesman {index}',
+                'login': f'ice_salesman_{index}',
+                'accessible_location_id': van_location.id,
+            })
+            car = cls.env['fleet.vehicle'].create({'model_id': model.id, 'license_plate': f'ICE-{index}'})
+            request = cls.env['ice.loading.request'].create({
+                'car_id': car.id,
+                'salesman_id': salesman.id,
+                'loading_place_id': cls.place.id,
+                # Non-urgent requests must be dispatched at least 6 hours ahead.
+                'dispatch_time': fields.Datetime.now() + timedelta(days=1),
+            })
+            cls.env['ice.loading.product.line'].create({
+                'loading_request_id': request.id,
+                'product_id': cls.product.id,
+                'quantity': 5,
+            })
+            request.write({'state': 'session_closed'})
+            # Three bags left in the van.
+            cls.env['stock.quant']._update_available_quantity(cls.product, van_location, 24)
+            cls.requests |= request
+            cls.van_locations |= van_location
+
+    def _open_wizard(self):
+        wizard = self.env['ice.bulk.warehouse.return.wizard'].create({'loading_place_id': self.place.id})
+        wizard.action_load_vans()
+        return wizard
+
+    def _van_quantity(self, van_location):
+        quantity = self.env['stock.quant']._get_available_quantity(self.product, van_location)
+        # The van inventory ledger follows the quants.
+        ledger_quantity = self.env['ice.driver.session.inventory']._get_on_hand(van_location, self.product)
+        self.assertEqual(ledger_quantity.get(self.product.id, 0.0), quantity)
+        return quantity
+
+    def test_load_vans(self):
+        wizard = self._open_wizard()
+        self.assertEqual(wizard.line_ids.loading_request_id, self.requests)
+        for line in wizard.line_ids:
+            self.assertEqual(line.product_id, self.product)
+            self.assertEqual(line.current_quantity, 3)
+            self.assertEqual(line.returned_quantity, 3)
+
+    def test_process_returns_and_scraps(self):
+        wizard = self._open_wizard()
+        first_line, second_line = wizard.line_ids.sorted(lambda l: l.loading_request_id.id)
+        first_line.write({'returned_quantity': 2, 'scrap_quantity': 1})
+        wizard.action_process()
+
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(set(wizard.result_ids.mapped('status')), {'done'})
+        for request, van_location in zip(self.requests, self.van_locations):
+            self.assertTrue(request.is_warehouse_check)
+            self.assertEqual(request.return_picking_id.state, 'done')
+            self.assertEqual(self._van_quantity(van_location), 0)
+        first_request = first_line.loading_request_id
+        self.assertEqual(first_request.loading_scrap_orders_ids.state, 'done')
+        self.assertEqual(first_request.loading_scrap_orders_ids.scrap_qty, 8)
+        self.assertFalse(second_line.loading_request_id.loading_scrap_orders_ids)
+
+    def test_inconsistent_van_is_skipped(self):
+        wizard = self._open_wizard()
+        first_line, second_line = wizard.line_ids.sorted(lambda l: l.loading_request_id.id)
+        first_line.write({'returned_quantity': 0, 'scrap_quantity': 5})
+        wizard.action_process()
+
+        results = {result.loading_request_id: result for result in wizard.result_ids}
+        self.assertEqual(results[first_line.loading_request_id].status, 'failed')
+        self.assertEqual(results[second_line.loading_request_id].status, 'done')
+        self.assertFalse(first_line.loading_request_id.is_warehouse_check)
+        self.assertEqual(self._van_quantity(self.van_locations.sorted('id')[0]), 24)
+        self.assertTrue(second_line.loading_request_id.is_warehouse_check)
+
+    def test_returned_and_scrap_exceed_van(self):
+        wizard = self._open_wizard()
+        first_line, second_line = wizard.line_ids.sorted(lambda l: l.loading_request_id.id)
+        first_line.write({'returned_quantity': 3, 'scrap_quantity': 1})
+        with self.assertRaises(ValidationError):
+            first_line._check_van_quantities()
+        second_line._check_van_quantities()
+
+        wizard.action_process()
+        results = {result.loading_request_id: result for result in wizard.result_ids}
+        self.assertEqual(results[first_line.loading_request_id].status, 'failed')
+        self.assertEqual(results[second_line.loading_request_id].status, 'done')
+        self.assertEqual(self._van_quantity(self.van_locations.sorted('id')[0]), 24)
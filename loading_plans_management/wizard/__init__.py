@@ -3,6 +3,7 @@ from . import loading_worker_wizard
 from . import quantity_change_wizard
 from . import pause_reason_wizard
 from . import warehouse_return_wizard
+from . import bulk_warehouse_return_wizard
 # from . import delivery_wizard
 from . import close_session_wizard
 from . import scrap_first_loading_wizard
@@ -0,0 +1,191 @@
+from odoo import models, fields, _
+from odoo.exceptions import UserError, ValidationError
+from collections import defaultdict
+import logging
+
+_logger = logging.getLogger(__name__)
+
+class BulkWarehouseReturnWizard(models.TransientModel):
+    _name = 'ice.bulk.warehouse.return.wizard'
+    _description = 'End of Day Warehouse Return'
+
+    loading_place_id = fields.Many2one('ice.loading.place', string='Loading Place', required=True)
+    state = fields.Selection([
+        ('draft', 'Quantities'),
+        ('done', 'Results'),
+    ], default='draft')
+    line_ids = fields.One2many('ice.bulk.warehouse.return.line', 'wizard_id', string='Return Lines')
+    result_ids = fields.One2many('ice.bulk.warehouse.return.result', 'wizard_id', string='Results', readonly=True)
+
+    def _get_requests(self):
+        """Closed sessions at the place whose van has not been checked by the warehouse yet."""
+        self.ensure_one()
+        return self.env['ice.loading.request'].search([
+            ('loading_place_id', '=', self.loading_place_id.id),
+            ('state', '=', 'session_closed'),
+            ('is_warehouse_check', '=', False),
+        ], order='dispatch_time, id')
+
+    def action_load_vans(self):
+        """Fill one line per van and product with what is currently in the van, all returned by default."""
+        self.ensure_one()
+        self.line_ids.unlink()
+        vals_list = []
+        for request in self._get_requests():
+            products = request.product_line_ids.product_id | request.second_product_line_ids.product_id
+            for product_id, (qty_display, _qty_pcs) in request._get_van_stock(products).items():
+                vals_list.append({
+                    'wizard_id': self.id,
+                    'loading_request_id': request.id,
+                    'product_id': product_id,
+                    'current_quantity': qty_display,
+                    'returned_quantity': max(qty_display, 0.0),
+                    'scrap_quantity': 0.0,
+                })
+        if not vals_list:
+            raise UserError(_("No closed session is waiting for a warehouse return at %s.") % self.loading_place_id.display_name)
+        self.env['ice.bulk.warehouse.return.line'].create(vals_list)
+        return self._reopen()
+
+    def action_process(self):
+        """
+        Return and scrap the stock of every van in batched creates. Vans
+        whose lines are inconsistent are skipped and reported; the others
+        are processed together.
+        """
+        self.ensure_one()
+        ReturnWizard = self.env['ice.warehouse.return.wizard']
+        lines_by_request = defaultdict(lambda: self.env['ice.bulk.warehouse.return.line'])
+        for line in self.line_ids:
+            lines_by_request[line.loading_request_id] |= line
+
+        results = []
+        picking_vals, picking_requests = [], []
+        scrap_vals, scrap_requests = [], []
+        for request, lines in lines_by_request.items():
+            return_lines = lines.filtered(lambda l: l.returned_quantity > 0)
+            scrap_lines = lines.filtered(lambda l: l.scrap_quantity > 0)
+            try:
+                lines._check_van_quantities()
+                request_picking_vals = ReturnWizard._prepare_return_picking_vals(return_lines, request) if return_lines else False
+                request_scrap_vals = ReturnWizard._prepare_scrap_vals(scrap_lines, request) if scrap_lines else []
+            except (UserError, ValidationError) as e:
+                results.append({'loading_request_id': request.id, 'status': 'failed', 'message': e.args[0]})
+                continue
+            if request_picking_vals:
+                picking_vals.append(request_picking_vals)
+                picking_requests.append(request)
+            scrap_vals += request_scrap_vals
+            scrap_requests += [request] * len(request_scrap_vals)
+            results.append({'loading_request_id': request.id, 'status': 'done'})
+
+        pickings = self.env['stock.picking'].create(picking_vals)
+        pickings.action_confirm()
+        pickings.action_assign()
+        ready = pickings.filtered(lambda p: p.state == 'assigned')
+        if ready:
+            ReturnWizard._validate_return_pickings(ready)
+
+        scraps = self.env['stock.scrap'].create(scrap_vals)
+        # Quantities were checked against the van stock above.
+        scraps._do_scrap_batch()
+
+        picking_by_request = dict(zip(picking_requests, pickings))
+        scraps_by_request = defaultdict(lambda: self.env['stock.scrap'])
+        for request, scrap in zip(scrap_requests, scraps):
+            scraps_by_request[request] |= scrap
+        processed = self.env['ice.loading.request']
+        for result in results:
+            if result['status'] != 'done':
+                continue
+            request = self.env['ice.loading.request'].browse(result['loading_request_id'])
+            picking = picking_by_request.get(request)
+            scrap_orders = scraps_by_request[request]
+            vals = {}
+            if picking:
+                vals['return_picking_id'] = picking.id
+                result['picking_id'] = picking.id
+                if picking.state != 'done':
+                    result['status'] = 'waiting'
+                    result['message'] = _("Return transfer %s is waiting for availability.") % picking.name
+            if scrap_orders:
+                vals['loading_scrap_orders_ids'] = [(6, 0, scrap_orders.ids)]
+                result['scrap_count'] = len(scrap_orders)
+            if vals:
+                request.write(vals)
+            processed |= request
+
+        processed.write({'is_warehouse_check': True})
+        for request in processed:
+            request.message_post(body=_("Warehouse return processed by %s (end of day).") % self.env.user.name)
+        _logger.info("Bulk warehouse return at %s: %s van(s) processed, %s skipped",
+                     self.loading_place_id.display_name, len(processed), len(results) - len(processed))
+
+        self.write({
+            'state': 'done',
+            'result_ids': [(5, 0, 0)] + [(0, 0, result) for result in results],
+        })
+        return self._reopen()
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class BulkWarehouseReturnLine(models.TransientModel):
+    _name = 'ice.bulk.warehouse.return.line'
+    _description = 'End of Day Warehouse Return Line'
+    _order = 'loading_request_id, product_id'
+
+    wizard_id = fields.Many2one('ice.bulk.warehouse.return.wizard', string='Wizard', required=True, ondelete='cascade')
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True, readonly=True)
+    car_id = fields.Many2one(related='loading_request_id.car_id', string='Car')
+    salesman_id = fields.Many2one(related='loading_request_id.salesman_id', string='Salesman')
+    product_id = fields.Many2one('product.product', string='Product', required=True, readonly=True)
+    current_quantity = fields.Float(string='Current Qty in Van', readonly=True)
+    returned_quantity = fields.Float(string='Returned Qty')
+    scrap_quantity = fields.Float(string='Scrap Qty')
+
+    def _check_van_quantities(self):
+        """
+        Same rules as the single-van return, plus availability checks: bulk
+        scraps are validated without the per-scrap availability dialog, and
+        the return and the scrap both take from the same van stock.
+        """
+        for line in self:
+            if line.returned_quantity < 0 or line.scrap_quantity < 0:
+                raise ValidationError(_("Return and scrap quantities cannot be negative."))
+            if (line.returned_quantity > 0 or line.scrap_quantity > 0) and line.current_quantity <= 0:
+                raise ValidationError(_(
+                    "For product '%s', the current quantity must be greater than zero to process returns or scraps."
+                ) % line.product_id.name)
+            if line.scrap_quantity > line.current_quantity:
+                raise ValidationError(_(
+                    "For product '%s', the scrap quantity (%s) exceeds the quantity in the van (%s)."
+                ) % (line.product_id.name, line.scrap_quantity, line.current_quantity))
+            if line.returned_quantity + line.scrap_quantity > line.current_quantity:
+                raise ValidationError(_(
+                    "For product '%s', the returned (%s) and scrap (%s) quantities exceed the quantity in the van (%s)."
+                ) % (line.product_id.name, line.returned_quantity, line.scrap_quantity, line.current_quantity))
+
+
+class BulkWarehouseReturnResult(models.TransientModel):
+    _name = 'ice.bulk.warehouse.return.result'
+    _description = 'End of Day Warehouse Return Result'
+
+    wizard_id = fields.Many2one('ice.bulk.warehouse.return.wizard', string='Wizard', required=True, ondelete='cascade')
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', readonly=True)
+    car_id = fields.Many2one(related='loading_request_id.car_id', string='Car')
+    status = fields.Selection([
+        ('done', 'Processed'),
+        ('waiting', 'Waiting Availability'),
+        ('failed', 'Skipped'),
+    ], string='Status', readonly=True)
+    message = fields.Char(string='Message', readonly=True)
+    picking_id = fields.Many2one('stock.picking', string='Return Transfer', readonly=True)
+    scrap_count = fields.Integer(string='Scrap Orders', readonly=True)
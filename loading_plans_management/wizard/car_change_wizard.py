@@ -128,10 +128,7 @@ class CarChangeWizard(models.TransientModel):
             subject=_('Car Changed by Fleet Supervisor')
         )
         
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'reload',
-        }
+        return {'type': 'ir.actions.act_window_close'}
     
     def _send_car_change_notifications(self):
         """Send notifications to relevant people"""
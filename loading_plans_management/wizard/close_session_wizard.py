@@ -1,5 +1,5 @@
 from odoo import models, fields, api, _
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
 
 class CloseSessionWizard(models.TransientModel):
     _name = 'ice.close.session.wizard'
@@ -39,23 +39,12 @@ class CloseSessionWizard(models.TransientModel):
                 if line.product_id.id not in product_map:
                     product_map[line.product_id.id] = {'loaded': 0.0, 'product': line.product_id}
                 product_map[line.product_id.id]['loaded'] += line.quantity
+            # Current van stock of every product, in Bags/Baskets for display
+            van_stock = loading_request._get_van_stock(
+                self.env['product.product'].browse(list(product_map)), search_location)
             # Create wizard lines
             for product_id, data in product_map.items():
-                product = data['product']
-                
-                # Get current quantity in Pcs from stock.quant
-                stock_quant = self.env['stock.quant'].search([
-                    ('product_id', '=', product_id),
-                    ('location_id', '=', search_location.id)
-                ], limit=1)
-                current_qty_pcs = stock_quant.quantity if stock_quant else 0.0
-                
-                # Convert current quantity to user-facing unit (Bags/Baskets) for display
-                current_qty_display = current_qty_pcs
-                if product.ice_product_type == '4kg' and product.pcs_per_bag > 0:
-                    current_qty_display = current_qty_pcs / product.pcs_per_bag
-                elif product.ice_product_type == 'cup' and product.pcs_per_basket > 0:
-                    current_qty_display = current_qty_pcs / product.pcs_per_basket
+                current_qty_display = van_stock[product_id][0]
 
                 line_vals = {
                     'product_id': product_id,
@@ -129,66 +118,19 @@ class CloseSessionWizard(models.TransientModel):
                 })
 
         if self.loading_request_id.is_concrete:
-            product_25kg = self.env.company.product_25kg_id.product_variant_id
-            warehouse = request.env['stock.warehouse'].search([
-                        ('lot_stock_id', '=', self.loading_request_id.car_id.location_id.id)
-                    ], limit=1)
             for line in self.customer_line_ids:
                 if line.quantity < 0:
                     raise UserError(_("Please enter a valid quantity for the Customer: %s") % line.customer_id.name)
-                if line.quantity > 0:
-                    price = False
-                    pricelist = line.customer_id.property_product_pricelist
-                    if pricelist:
-                        pricelist_item = pricelist.item_ids.filtered(
-                            lambda r: r.product_id == product_25kg or r.product_tmpl_id == product_25kg.product_tmpl_id)
-                        if pricelist_item:
-                            price = pricelist._get_product_price(product_25kg, line.quantity, line.customer_id)
-
-                    if not price:
-                        price = product_25kg.lst_price
-                    
-                    concrete_order_vals = {
-                    'partner_id': line.customer_id.id,
-                    'order_line': [(0, 0, {
-                        'product_id': product_25kg.id,
-                        'product_uom_qty': line.quantity,
-                        'name': product_25kg.display_name,  # Name of the product in the order line
-                        'price_unit': price
-                    })],
-                    'is_concrete': True,
-                    'loading_request_id': self.loading_request_id.id,
-                    'car_id': self.loading_request_id.car_id.id,
-                    'user_id': self.loading_request_id.team_leader_id.id,  # Set the salesperson as the request maker
-                    'pricelist_id': pricelist.id if pricelist else None,
-                    'warehouse_id': warehouse.id if warehouse else None,
-                }
+            sold_lines = self.customer_line_ids.filtered(lambda l: l.quantity > 0)
+            orders = request._create_concrete_sale_orders(
+                [(line.customer_id, line.quantity) for line in sold_lines])
+            self.env['ice.loading.customer.line'].create([{
+                'loading_request_id': request.id,
+                'customer_id': line.customer_id.id,
+                'quantity': line.quantity,
+                'sale_order_id': order.id,
+            } for line, order in zip(sold_lines, orders)])
 
-                concrete_order = request.env['sale.order'].create(concrete_order_vals)
-                concrete_order.action_confirm()
-                for picking in concrete_order.picking_ids:
-                    if picking.state not in ('done', 'cancel'):
-                        picking.write({'location_id': self.loading_request_id.car_id.location_id.id})
-                        picking.write({'user_id': user.id})
-                        for move_line in picking.move_line_ids:
-                            move_line.write({'location_id': self.loading_request_id.car_id.location_id.id})
-                    if picking.state not in ('done', 'cancel'):
-                        picking.action_confirm()
-                        picking.action_assign()
-                        for move_line in picking.move_line_ids:
-                            move_line.qty_done = move_line.quantity_product_uom
-                        picking.button_validate()
-                self.env['ice.loading.customer.line'].create({
-                    'loading_request_id': request.id,
-                    'customer_id': line.customer_id.id,
-                    'quantity': line.quantity,
-                    'sale_order_id': concrete_order.id,
-                    # 'delivery_id': concrete_order.picking_ids[0].id
-                })
-        
-            
-        
-        
         return {'type': 'ir.actions.act_window_close'}
 
 class CloseSessionProductLine(models.TransientModel):
@@ -1,5 +1,6 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
+from collections import defaultdict
 
 class LoadingWorkerWizard(models.TransientModel):
     _name = 'ice.loading.worker.wizard'
@@ -7,18 +8,7 @@ class LoadingWorkerWizard(models.TransientModel):
     
     loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True)
     
-    # Store the product data directly in the wizard
-    product_1_id = fields.Many2one('product.product', string='Product 1', readonly=True)
-    product_1_requested = fields.Float(string='Requested Qty 1', readonly=True)
-    product_1_loaded = fields.Float(string='Actually Loaded 1')
-    
-    product_2_id = fields.Many2one('product.product', string='Product 2', readonly=True)
-    product_2_requested = fields.Float(string='Requested Qty 2', readonly=True)
-    product_2_loaded = fields.Float(string='Actually Loaded 2')
-    
-    product_3_id = fields.Many2one('product.product', string='Product 3', readonly=True)
-    product_3_requested = fields.Float(string='Requested Qty 3', readonly=True)
-    product_3_loaded = fields.Float(string='Actually Loaded 3')
+    line_ids = fields.One2many('ice.loading.worker.wizard.line', 'wizard_id', string='Products')
     
     # Display fields
     car_name = fields.Char(related='loading_request_id.car_id.license_plate', readonly=True)
@@ -33,26 +23,11 @@ class LoadingWorkerWizard(models.TransientModel):
             loading_request = self.env['ice.loading.request'].browse(loading_request_id)
             defaults['loading_request_id'] = loading_request_id
             
-            # Get the product lines and populate fields directly
-            product_lines = loading_request.product_line_ids.filtered(lambda l: l.quantity > 0)
-            
-            if len(product_lines) >= 1:
-                line = product_lines[0]
-                defaults['product_1_id'] = line.product_id.id
-                defaults['product_1_requested'] = line.quantity
-                # defaults['product_1_loaded'] = line.quantity
-                
-            if len(product_lines) >= 2:
-                line = product_lines[1]
-                defaults['product_2_id'] = line.product_id.id
-                defaults['product_2_requested'] = line.quantity
-                # defaults['product_2_loaded'] = line.quantity
-                
-            if len(product_lines) >= 3:
-                line = product_lines[2]
-                defaults['product_3_id'] = line.product_id.id
-                defaults['product_3_requested'] = line.quantity
-                # defaults['product_3_loaded'] = line.quantity
+            # One wizard line per product to load
+            defaults['line_ids'] = [(0, 0, {
+                'product_id': line.product_id.id,
+                'requested_quantity': line.quantity,
+            }) for line in loading_request.product_line_ids.filtered(lambda l: l.quantity > 0)]
         
         return defaults
     
@@ -69,98 +44,65 @@ class LoadingWorkerWizard(models.TransientModel):
         if not picking:
             raise UserError(_('No internal transfer found.'))
         
-        # Check for differences and show confirmation if needed
-        differences = []
-        if self.product_1_id and self.product_1_loaded < self.product_1_requested:
-            raise UserError(_('Product 1 loaded quantity cannot be less than requested.'))
-        if self.product_2_id and self.product_2_loaded < self.product_2_requested:
-            raise UserError(_('Product 2 loaded quantity cannot be less than requested.'))
-        if self.product_3_id and self.product_3_loaded < self.product_3_requested:
-            raise UserError(_('Product 3 loaded quantity cannot be less than requested.'))
-        if self.product_1_id and self.product_1_loaded > self.product_1_requested:
-            raise UserError(_('Product 1 loaded quantity cannot be more than requested.'))
-        if self.product_2_id and self.product_2_loaded > self.product_2_requested:
-            raise UserError(_('Product 2 loaded quantity cannot be more than requested.'))
-        if self.product_3_id and self.product_3_loaded > self.product_3_requested:
-            raise UserError(_('Product 3 loaded quantity cannot be more than requested.'))
-        
+        # Loaded quantities must match the request exactly
+        for line in self.line_ids:
+            if line.loaded_quantity < line.requested_quantity:
+                raise UserError(_('%s loaded quantity cannot be less than requested.') % line.product_id.name)
+            if line.loaded_quantity > line.requested_quantity:
+                raise UserError(_('%s loaded quantity cannot be more than requested.') % line.product_id.name)
         
         return self._complete_loading()
     
+    @api.model
+    def _set_picking_quantities(self, picking, quantities):
+        """
+        Replace the reservation of ``picking`` with the loaded quantities:
+        the demand of each move becomes the loaded quantity and a single move
+        line carries it.
+        :param quantities: {product.product: quantity in bags/baskets/pieces}
+        """
+        # Unreserve the picking and delete existing move lines to prevent duplication
+        picking.do_unreserve()
+        picking.move_line_ids.unlink()
+
+        moves_by_product = {move.product_id: move for move in picking.move_ids_without_package}
+        moves_by_demand = defaultdict(lambda: self.env['stock.move'])
+        move_line_vals = []
+        for product, quantity in quantities.items():
+            move = moves_by_product.get(product)
+            if not move:
+                continue
+            qty_in_pcs = quantity * product._get_ice_pcs_per_unit()
+            moves_by_demand[qty_in_pcs] |= move
+            move_line_vals.append({
+                'move_id': move.id,
+                'picking_id': picking.id,
+                'product_id': move.product_id.id,
+                'location_id': move.location_id.id,
+                'location_dest_id': move.location_dest_id.id,
+                'quantity': qty_in_pcs,
+                'product_uom_id': move.product_uom.id,
+            })
+        # Moves loaded with the same quantity share one write
+        for qty_in_pcs, moves in moves_by_demand.items():
+            moves.write({'product_uom_qty': qty_in_pcs})
+        self.env['stock.move.line'].create(move_line_vals)
+
     def _complete_loading(self):
         """Complete the actual loading process"""
         picking = self.loading_request_id.internal_transfer_id
         
         # Track quantity changes for chatter
         quantity_changes = []
-        # Helper function to convert to PCS
-        def convert_to_pcs(product, quantity):
-            if not product:
-                return 0.0
-            if product.ice_product_type == '4kg':
-                return quantity * (product.pcs_per_bag or 8)
-            elif product.ice_product_type == 'cup':
-                return quantity * (product.pcs_per_basket or 24)
-            else: # 25kg or other types are already in pcs
-                return quantity
-            
-        # # 1. Unreserve the picking and delete existing move lines to prevent duplication
-        picking.do_unreserve()
-        picking.move_line_ids.unlink()
+        # Set the final quantities: new demands and one move line per product
+        self._set_picking_quantities(picking, {line.product_id: line.loaded_quantity for line in self.line_ids})
         
-        # 2. Update the total demand on the parent stock.move records
-        #    and create a new, single stock.move.line for each move to encode the final quantity.
-        if self.product_1_id:
-            move = picking.move_ids_without_package.filtered(lambda m: m.product_id == self.product_1_id)
-            if move:
-                qty_in_pcs = convert_to_pcs(self.product_1_id, self.product_1_loaded)
-                move.product_uom_qty = qty_in_pcs
-                self.env['stock.move.line'].create({
-                    'move_id': move.id,
-                    'picking_id': picking.id,
-                    'product_id': move.product_id.id,
-                    'location_id': move.location_id.id,
-                    'location_dest_id': move.location_dest_id.id,
-                    'quantity': qty_in_pcs,
-                    'product_uom_id': move.product_uom.id,
-                })
-        
-        if self.product_2_id:
-            move = picking.move_ids_without_package.filtered(lambda m: m.product_id == self.product_2_id)
-            if move:
-                qty_in_pcs = convert_to_pcs(self.product_2_id, self.product_2_loaded)
-                move.product_uom_qty = qty_in_pcs
-                self.env['stock.move.line'].create({
-                    'move_id': move.id,
-                    'picking_id': picking.id,
-                    'product_id': move.product_id.id,
-                    'location_id': move.location_id.id,
-                    'location_dest_id': move.location_dest_id.id,
-                    'quantity': qty_in_pcs,
-                    'product_uom_id': move.product_uom.id,
-                })
-
-        if self.product_3_id:
-            move = picking.move_ids_without_package.filtered(lambda m: m.product_id == self.product_3_id)
-            if move:
-                qty_in_pcs = convert_to_pcs(self.product_3_id, self.product_3_loaded)
-                move.product_uom_qty = qty_in_pcs
-                self.env['stock.move.line'].create({
-                    'move_id': move.id,
-                    'picking_id': picking.id,
-                    'product_id': move.product_id.id,
-                    'location_id': move.location_id.id,
-                    'location_dest_id': move.location_dest_id.id,
-                    'quantity': qty_in_pcs,
-                    'product_uom_id': move.product_uom.id,
-                })
-        
-        # Validate picking
-        picking.button_validate()
+        # Validate the picking in the background; StockPicking.button_validate()
+        # moves the request to 'ice_handled' once the job succeeds.
+        self.env['ice.picking.validation.job']._enqueue(picking)
         
         # Update loading request
         self.loading_request_id.write({
-            'state': 'ice_handled',
             'loading_end_date': fields.Datetime.now(),
             })
         
@@ -180,18 +122,14 @@ class LoadingWorkerWizard(models.TransientModel):
         
         # Add final loaded quantities
         message_parts.append("<p><strong>📦 Final Loaded Quantities:</strong></p><ul>")
-        if self.product_1_id:
-            message_parts.append(f"<li><strong>{self.product_1_id.name}:</strong> {self.product_1_loaded:.0f}</li>")
-        if self.product_2_id:
-            message_parts.append(f"<li><strong>{self.product_2_id.name}:</strong> {self.product_2_loaded:.0f}</li>")
-        if self.product_3_id:
-            message_parts.append(f"<li><strong>{self.product_3_id.name}:</strong> {self.product_3_loaded:.0f}</li>")
+        for line in self.line_ids:
+            message_parts.append(f"<li><strong>{line.product_id.name}:</strong> {line.loaded_quantity:.0f}</li>")
         message_parts.append("</ul>")
         
         # Add transfer information
         message_parts.append(f"<p><strong>📋 Transfer Details:</strong></p>")
         message_parts.append(f"<ul><li><strong>Transfer:</strong> {picking.name}</li>")
-        message_parts.append(f"<li><strong>Status:</strong> Validated</li>")
+        message_parts.append(f"<li><strong>Status:</strong> Queued for validation</li>")
         message_parts.append(f"<li><strong>Loading Date:</strong> {fields.Datetime.now().strftime('%Y-%m-%d %H:%M')}</li></ul>")
         
         final_message = ''.join(message_parts)
@@ -209,6 +147,16 @@ class LoadingWorkerWizard(models.TransientModel):
         return {'type': 'ir.actions.act_window_close'}
 
 
+class LoadingWorkerWizardLine(models.TransientModel):
+    _name = 'ice.loading.worker.wizard.line'
+    _description = 'Loading Worker Wizard Line'
+
+    wizard_id = fields.Many2one('ice.loading.worker.wizard', string='Wizard', required=True, ondelete='cascade')
+    product_id = fields.Many2one('product.product', string='Product', required=True, readonly=True)
+    requested_quantity = fields.Float(string='Requested', readonly=True)
+    loaded_quantity = fields.Float(string='Actually Loaded')
+
+
 class LoadingConfirmWizard(models.TransientModel):
     _name = 'ice.loading.confirm.wizard'
     _description = 'Loading Confirmation Wizard'
@@ -1,5 +1,6 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
+from collections import defaultdict
 
 class LoadingQuantityChangeWizard(models.TransientModel):
     _name = 'ice.loading.quantity.change.wizard'
@@ -37,57 +38,84 @@ class LoadingQuantityChangeWizard(models.TransientModel):
         if not self.env.user.has_group('sales_team.group_sale_salesman_all_leads'):
             raise UserError(_('Only Sales Supervisors can change quantities.'))
         
-        # Check state
-        if self.loading_request_id.state in ['ice_handled', 'plugged', 'in_transit', 'delivered', 'done', 'cancelled']:
-            raise UserError(_('Cannot change quantities after the request has been ice handled.'))
-        
-        # Validate and update quantities
-        changes_made = False
-        for wizard_line in self.line_ids:
-            if wizard_line.new_quantity != wizard_line.current_quantity:
-                changes_made = True
-                # Find corresponding product line
-                product_line = self.loading_request_id.product_line_ids.filtered(
-                    lambda l: l.product_id.id == wizard_line.product_id.id
-                )
-                if product_line:
-                    # Create change history record
-                    self.env['ice.loading.quantity.change'].create({
-                        'loading_request_id': self.loading_request_id.id,
-                        'product_id': wizard_line.product_id.id,
-                        'old_quantity': wizard_line.current_quantity,
-                        'new_quantity': wizard_line.new_quantity,
-                        'change_reason': self.change_reason,
-                    })
-                    
-                    # Update the quantity
-                    product_line.quantity = wizard_line.new_quantity
-                    product_line.is_full_load = False  # Reset full load flag
-        
-        if changes_made:
-            # Post message in chatter
-            message = _("Quantities changed by %s<br/>Reason: %s") % (
-                self.env.user.name,
-                self.change_reason
-            )
-            self.loading_request_id.message_post(
-                body=message,
-                subject=_('Loading Quantities Changed')
-            )
-            
-            # If internal transfer exists, update it
-            if self.loading_request_id.internal_transfer_id and self.loading_request_id.internal_transfer_id.state == 'assigned':
-                picking = self.loading_request_id.internal_transfer_id
-                for move in picking.move_ids_without_package:
-                    product_line = self.loading_request_id.product_line_ids.filtered(
-                        lambda l: l.product_id.id == move.product_id.id
-                    )
-                    if product_line:
-                        move.product_uom_qty = product_line.quantity
+        self.env['ice.loading.quantity.change']._apply_changes(
+            {self.loading_request_id: {line.product_id: line.new_quantity for line in self.line_ids}},
+            self.change_reason,
+        )
         
         return {'type': 'ir.actions.act_window_close'}
 
 
+class LoadingBulkQuantityChangeWizard(models.TransientModel):
+    _name = 'ice.loading.bulk.quantity.change.wizard'
+    _description = 'Ice Loading Bulk Quantity Change Wizard'
+
+    change_reason = fields.Text(string='Reason for Change', required=True)
+    line_ids = fields.One2many('ice.loading.bulk.quantity.change.wizard.line', 'wizard_id', string='Product Lines')
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'ice.loading.request' and 'line_ids' in fields_list:
+            requests = self.env['ice.loading.request'].browse(self.env.context.get('active_ids', []))
+            requests = requests.filtered(lambda r: r.state in ['draft', 'car_checking', 'ready_for_loading', 'receive_key'])
+            if not requests:
+                raise UserError(_('None of the selected requests can still have its quantities changed.'))
+            res['line_ids'] = [(0, 0, {
+                'loading_request_id': line.loading_request_id.id,
+                'product_id': line.product_id.id,
+                'product_type': line.product_type,
+                'current_quantity': line.quantity,
+                'new_quantity': line.quantity,
+            }) for line in requests.product_line_ids]
+        return res
+
+    def action_confirm(self):
+        """Apply the quantity changes of every selected request at once"""
+        self.ensure_one()
+        # Same check as the single-request wizard.
+        if not self.env.user.has_group('sales_team.group_sale_salesman_all_leads'):
+            raise UserError(_('Only Sales Supervisors can change quantities.'))
+
+        new_quantities = defaultdict(dict)
+        for line in self.line_ids:
+            new_quantities[line.loading_request_id][line.product_id] = line.new_quantity
+        changes = self.env['ice.loading.quantity.change']._apply_changes(new_quantities, self.change_reason)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': _('%s quantity change(s) applied to %s request(s).') % (
+                    len(changes), len(changes.loading_request_id)),
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+
+class LoadingBulkQuantityChangeWizardLine(models.TransientModel):
+    _name = 'ice.loading.bulk.quantity.change.wizard.line'
+    _description = 'Loading Bulk Quantity Change Wizard Line'
+
+    wizard_id = fields.Many2one('ice.loading.bulk.quantity.change.wizard', string='Wizard', required=True, ondelete='cascade')
+    loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True, readonly=True)
+    car_id = fields.Many2one(related='loading_request_id.car_id', string='Car')
+    product_id = fields.Many2one('product.product', string='Product', required=True, readonly=True)
+    product_type = fields.Selection([
+        ('4kg', '4kg Ice'),
+        ('25kg', '25kg Ice'),
+        ('cup', 'Ice Cup')
+    ], string='Product Type', readonly=True)
+    current_quantity = fields.Float(string='Current Quantity', readonly=True)
+    new_quantity = fields.Float(string='New Quantity', required=True)
+
+    @api.constrains('new_quantity')
+    def _check_quantity(self):
+        for line in self:
+            if line.new_quantity < 0:
+                raise ValidationError(_("Quantity cannot be negative."))
+
+
 class LoadingQuantityChangeWizardLine(models.TransientModel):
     _name = 'ice.loading.quantity.change.wizard.line'
     _description = 'Loading Quantity Change Wizard Line'
@@ -11,32 +11,6 @@ class ScrapProductsWizard(models.TransientModel):
     loading_request_id = fields.Many2one('ice.loading.request', string='Loading Request', required=True)
     line_ids = fields.One2many('ice.scrap.products.line', 'wizard_id', string='Products')
 
-    def _get_current_quantity_in_display_units(self, product, salesman_location):
-        """Helper method to get current quantity in display units"""
-        # Get the database cursor for a direct query
-        cr = self.env.cr
-        
-        
-        sql_query = """
-            SELECT SUM(quantity)
-            FROM stock_quant
-            WHERE product_id = %s AND location_id = %s
-        """
-        cr.execute(sql_query, (product.id, salesman_location.id))
-        query_result = cr.fetchone()
-        
-        current_qty_in_pcs = query_result[0] if query_result and query_result[0] is not None else 0.0
-        
-        # Convert the quantity from Pcs to the user-facing unit (Bags/Baskets) for display
-        current_qty_display = current_qty_in_pcs
-        
-        if product.ice_product_type == '4kg' and (product.pcs_per_bag or 8) > 0:
-            current_qty_display = current_qty_in_pcs / (product.pcs_per_bag or 8)
-        elif product.ice_product_type == 'cup' and (product.pcs_per_basket or 24) > 0:
-            current_qty_display = current_qty_in_pcs / (product.pcs_per_basket or 24)
-            
-        return current_qty_display, current_qty_in_pcs
-
     @api.model
     def default_get(self, fields_list):
         res = super().default_get(fields_list)
@@ -44,46 +18,19 @@ class ScrapProductsWizard(models.TransientModel):
         
         if not loading_request:
             raise UserError(_("No loading request found in context."))
-        salesman_location = False
-        if loading_request.is_concrete:
-            salesman_location = loading_request.car_id.location_id
-        else:
-            salesman_location = loading_request.salesman_id.accessible_location_id
+        salesman_location = loading_request._get_van_location()
         if not salesman_location:
             raise UserError(_("Salesman's stock location is not configured."))
 
 
         lines = []
+        van_stock = loading_request._get_van_stock(loading_request.product_line_ids.product_id, salesman_location)
 
         for line in loading_request.product_line_ids:
             product = line.product_id
-            
-            _logger.info(f"Processing product: {product.display_name} (ID: {product.id})")
-            
-            current_qty_display, current_qty_in_pcs = self._get_current_quantity_in_display_units(product, salesman_location)
-            
-            # Multiple method logging for debugging
-            # Method 2: Using Odoo's stock quant method (for comparison)
-            quants = self.env['stock.quant'].search([
-                ('product_id', '=', product.id),
-                ('location_id', '=', salesman_location.id)
-            ])
-            current_qty_in_pcs_odoo = sum(quants.mapped('quantity'))
-            _logger.info(f"SQL Query result for {product.display_name}: {current_qty_in_pcs} Pcs")
-            _logger.info(f"Odoo quant search result for {product.display_name}: {current_qty_in_pcs_odoo} Pcs")
-            
-            # Method 3: Using product's qty_available (for comparison)
-            product_with_location = product.with_context(location=salesman_location.id)
-            current_qty_in_pcs_available = product_with_location.qty_available
-            _logger.info(f"qty_available for {product.display_name}: {current_qty_in_pcs_available} Pcs")
-            
-            conversion_info = "Pcs"
-            if product.ice_product_type == '4kg':
-                conversion_info = f"Bags (Pcs: {current_qty_in_pcs}, Conversion: /{product.pcs_per_bag or 8})"
-            elif product.ice_product_type == 'cup':
-                conversion_info = f"Baskets (Pcs: {current_qty_in_pcs}, Conversion: /{product.pcs_per_basket or 24})"
-            
-            _logger.info(f"Final display quantity for {product.display_name}: {current_qty_display} {conversion_info}")
+            current_qty_display, current_qty_in_pcs = van_stock[product.id]
+            _logger.info(f"Van stock for {product.display_name}: {current_qty_display} "
+                         f"({current_qty_in_pcs} Pcs, /{product._get_ice_pcs_per_unit()})")
 
             lines.append((0, 0, {
                 'product_id': product.id,
@@ -98,20 +45,15 @@ class ScrapProductsWizard(models.TransientModel):
         self.ensure_one()
         picking_moves = []
         request = self.loading_request_id
-        salesman_location = False
-        if request.is_concrete:
-            salesman_location = request.car_id.location_id
-        else:
-            salesman_location = request.salesman_id.accessible_location_id
+        salesman_location = request._get_van_location()
         
         
         # CRITICAL FIX: Refresh current quantities before validation
+        van_stock = request._get_van_stock(self.line_ids.product_id, salesman_location)
         for line in self.line_ids:
             if line.scrap_qty > 0:
                 # Get fresh current quantity
-                current_qty_display, current_qty_in_pcs = self._get_current_quantity_in_display_units(
-                    line.product_id, salesman_location
-                )
+                current_qty_display, current_qty_in_pcs = van_stock[line.product_id.id]
                 
                 _logger.info(f"Processing scrap for {line.product_id.display_name}: "
                            f"scrap_qty={line.scrap_qty}, "
@@ -137,44 +79,38 @@ class ScrapProductsWizard(models.TransientModel):
                 # Update the line with fresh quantity for consistency
                 line.current_qty = current_qty_display
         
-        # Process scraps
-        created_scraps = []
-        for line in self.line_ids:
-            if line.scrap_qty > 0:
-                # Create scrap order
-                product = line.product_id
-                scrap_qty_in_pcs = line.scrap_qty
-                if product.ice_product_type == '4kg':
-                    scrap_qty_in_pcs = line.scrap_qty * (product.pcs_per_bag or 8)
-                elif product.ice_product_type == 'cup':
-                    scrap_qty_in_pcs = line.scrap_qty * (product.pcs_per_basket or 24)
-                
-                _logger.info(f"Creating scrap for {product.display_name}: {scrap_qty_in_pcs} Pcs")
-                
-                scrap = self.env['stock.scrap'].create({
-                    'product_id': line.product_id.id,
-                    'scrap_qty': scrap_qty_in_pcs,
-                    'product_uom_id': product.uom_id.id,
-                    'location_id': request.salesman_id.accessible_location_id.id,
-                    'origin': request.name,
-                    'loading_request_id': request.id,  # Add this if the field exists
+        # Process scraps: one create and one validation for all the lines,
+        # quantities were checked against the van stock above.
+        scrap_lines = self.line_ids.filtered(lambda l: l.scrap_qty > 0)
+        scrap_vals = []
+        for line in scrap_lines:
+            product = line.product_id
+            scrap_qty_in_pcs = line.scrap_qty * product._get_ice_pcs_per_unit()
+            _logger.info(f"Creating scrap for {product.display_name}: {scrap_qty_in_pcs} Pcs")
+            scrap_vals.append({
+                'product_id': product.id,
+                'scrap_qty': scrap_qty_in_pcs,
+                'product_uom_id': product.uom_id.id,
+                'location_id': request.salesman_id.accessible_location_id.id,
+                'origin': request.name,
+                'loading_request_id': request.id,
+            })
+        scraps = self.env['stock.scrap'].create(scrap_vals)
+        scraps._do_scrap_batch()
+
+        # Update second loading lines
+        second_lines = {line.product_id.id: line for line in reversed(request.second_product_line_ids)}
+        for scrap in scraps:
+            second_line = second_lines.get(scrap.product_id.id)
+            if second_line:
+                second_line.write({
+                    'scrap_quantity': scrap.scrap_qty,
+                    'quantity': second_line.requested_quantity,
                 })
-                
-                created_scraps.append(scrap.id)
-                scrap.action_validate()
-                
-                # Update second loading lines
-                second_line = self.env['second.ice.loading.product.line'].search([
-                    ('loading_request_id', '=', request.id),
-                    ('product_id', '=', line.product_id.id)
-                ], limit=1)
-                if second_line:
-                    second_line.scrap_quantity = scrap_qty_in_pcs
-                    second_line.quantity = second_line.requested_quantity
-        
+
         # Update loading request with created scraps
-        if created_scraps:
-            request.first_loading_scrap_ids = [(6, 0, created_scraps)]
+        if scraps:
+            request.first_loading_scrap_ids = [(6, 0, scraps.ids)]
         
         # Create internal transfer for remaining quantities for the second load
         dest_location = request.salesman_id.accessible_location_id.id
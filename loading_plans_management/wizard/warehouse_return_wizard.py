@@ -50,23 +50,12 @@ class WarehouseReturnWizard(models.TransientModel):
                         product_map[line.product_id.id] = {'loaded': 0.0, 'product': line.product_id}
                     product_map[line.product_id.id]['loaded'] += line.quantity
             
+            # Current van stock of every product, in Bags/Baskets for display
+            van_stock = loading_request._get_van_stock(
+                self.env['product.product'].browse(list(product_map)), search_location)
             # Create wizard lines
             for product_id, data in product_map.items():
-                product = data['product']
-                
-                # Get current quantity in Pcs from stock.quant
-                stock_quant = self.env['stock.quant'].search([
-                    ('product_id', '=', product_id),
-                    ('location_id', '=', search_location.id)
-                ], limit=1)
-                current_qty_pcs = stock_quant.quantity if stock_quant else 0.0
-                
-                # Convert current quantity to user-facing unit (Bags/Baskets) for display
-                current_qty_display = current_qty_pcs
-                if product.ice_product_type == '4kg' and product.pcs_per_bag > 0:
-                    current_qty_display = current_qty_pcs / product.pcs_per_bag
-                elif product.ice_product_type == 'cup' and product.pcs_per_basket > 0:
-                    current_qty_display = current_qty_pcs / product.pcs_per_basket
+                current_qty_display = van_stock[product_id][0]
 
                 line_vals = {
                     'product_id': product_id,
@@ -213,21 +202,16 @@ class WarehouseReturnWizard(models.TransientModel):
                 product_map[line.product_id.id] += line.quantity
         
         # Create new lines
-        for product_id, loaded_qty in product_map.items():
-            stock_quant = self.env['stock.quant'].search([
-                ('product_id', '=', product_id),
-                ('location_id', '=', search_location.id)
-            ], limit=1)
-            current_qty = stock_quant.quantity if stock_quant else 0.0
-            
-            self.env['ice.warehouse.return.wizard.line'].create({
-                'wizard_id': self.id,
-                'product_id': product_id,
-                'loaded_quantity': loaded_qty,
-                'current_quantity': current_qty,
-                'returned_quantity': 0.0,
-                'scrap_quantity': 0.0,
-            })
+        van_stock = self.loading_request_id._get_van_stock(
+            self.env['product.product'].browse(list(product_map)), search_location)
+        self.env['ice.warehouse.return.wizard.line'].create([{
+            'wizard_id': self.id,
+            'product_id': product_id,
+            'loaded_quantity': loaded_qty,
+            'current_quantity': van_stock[product_id][0],
+            'returned_quantity': 0.0,
+            'scrap_quantity': 0.0,
+        } for product_id, loaded_qty in product_map.items()])
 
     def action_process_return(self):
         """
@@ -260,7 +244,11 @@ class WarehouseReturnWizard(models.TransientModel):
                     raise ValidationError(_(
                         "For product '%s', the current quantity must be greater than zero to process returns or scraps. click button refresh products"
                     ) % line.product_id.name)
-        
+            if line.scrap_quantity > line.current_quantity:
+                raise ValidationError(_(
+                    "For product '%s', the scrap quantity (%s) exceeds the quantity in the van (%s)."
+                ) % (line.product_id.name, line.scrap_quantity, line.current_quantity))
+
         # Only proceed if there are quantities to return or scrap
         has_returns = any(line.returned_quantity > 0 for line in self.line_ids)
         has_scraps = any(line.scrap_quantity > 0 for line in self.line_ids)
@@ -290,14 +278,32 @@ class WarehouseReturnWizard(models.TransientModel):
         if not return_lines:
             return
 
+        # Create the picking
+        picking = self.env['stock.picking'].create(self._prepare_return_picking_vals(return_lines, loading_request))
+        
+        # Validate the picking immediately
+        picking.action_confirm()  # Confirm the picking
+        picking.action_assign()   # Reserve the picking
+        
+        # Check if it's immediately available 
+        if picking.state == 'assigned':
+            self._validate_return_pickings(picking)
+        
+        return picking
+
+    @api.model
+    def _prepare_return_picking_vals(self, return_lines, loading_request):
+        """
+        Values of the internal transfer bringing ``return_lines`` back from
+        the van to the loading place.
+        :param return_lines: records with product_id and returned_quantity
+                             in bags/baskets/pieces.
+        """
         if not loading_request.loading_place_id.loading_location_id:
             raise UserError(_("Please specify a return warehouse."))
             
         # Find appropriate locations
-        search_location = loading_request.salesman_id.accessible_location_id
-        if loading_request.is_concrete:
-            search_location = loading_request.car_id.location_id
-        source_location = search_location
+        source_location = loading_request._get_van_location()
         dest_location = loading_request.loading_place_id.loading_location_id
         
         # Create picking type - use internal transfer
@@ -308,106 +314,72 @@ class WarehouseReturnWizard(models.TransientModel):
         
         if not picking_type:
             raise UserError(_("No internal transfer operation type found for the salesman warehouse."))
-            
         
         move_vals_list = []
         for line in return_lines:
             product = line.product_id
-            qty_to_return_pcs = line.returned_quantity
-            if product.ice_product_type == '4kg':
-                qty_to_return_pcs = line.returned_quantity * (product.pcs_per_bag or 8)
-            elif product.ice_product_type == 'cup':
-                qty_to_return_pcs = line.returned_quantity * (product.pcs_per_basket or 24)
-            
             move_vals_list.append((0, 0, {
                 'name': f"Return of {product.name}",
                 'product_id': product.id,
-                'product_uom_qty': qty_to_return_pcs,
+                'product_uom_qty': line.returned_quantity * product._get_ice_pcs_per_unit(),
                 'product_uom': product.uom_id.id,
                 'location_id': source_location.id,
                 'location_dest_id': dest_location.id,
             }))
         
-        # Create the return picking
-        picking_vals = {
+        return {
             'picking_type_id': picking_type.id,
             'location_id': source_location.id,
             'location_dest_id': dest_location.id,
             'scheduled_date': fields.Datetime.now(),
-            'origin': loading_request.name,  # Fixed: was using self.name which doesn't exist
+            'origin': loading_request.name,
+            'loading_request_id': loading_request.id,
             'user_id': self.env.user.id,
             'move_ids_without_package': move_vals_list,
         }
-        
-        # Add move lines
-        # for line in return_lines:
-        #     move_vals = {
-        #         'name': f"Return of {line.product_id.name}",
-        #         'product_id': line.product_id.id,
-        #         'product_uom_qty': line.returned_quantity,
-        #         'product_uom': line.product_id.uom_id.id,
-        #         'location_id': source_location.id,
-        #         'location_dest_id': dest_location.id,
-        #     }
-        #     picking_vals['move_ids'].append((0, 0, move_vals))
-            
-        # Create the picking
-        picking = self.env['stock.picking'].create(picking_vals)
-        
-        # Validate the picking immediately
-        picking.action_confirm()  # Confirm the picking
-        picking.action_assign()   # Reserve the picking
-        
-        # Check if it's immediately available 
-        if picking.state == 'assigned':
-            # Create a backorder if any move is not fully available
-            for move_line in picking.move_line_ids:
-                if move_line.quantity_product_uom != move_line.quantity:
-                    move_line.quantity = move_line.quantity_product_uom
-            
-            # Validate the picking
-            picking.button_validate()
-        
-        return picking
+
+    @api.model
+    def _validate_return_pickings(self, pickings):
+        """Validate reserved return transfers for the full reserved quantities."""
+        for move_line in pickings.move_line_ids:
+            if move_line.quantity_product_uom != move_line.quantity:
+                move_line.quantity = move_line.quantity_product_uom
+        pickings.button_validate()
 
     def _create_scrap_orders(self, scrap_lines, loading_request):
         """Create scrap orders for the quantities to be scrapped"""
         if not scrap_lines:
             return
             
-        scrap_location = self.env.company.scrap_location_id 
-        scrap_orders = self.env['stock.scrap']
+        # Quantities were checked against the van stock in action_process_return.
+        scrap_orders = self.env['stock.scrap'].create(self._prepare_scrap_vals(scrap_lines, loading_request))
+        scrap_orders._do_scrap_batch()
+        return scrap_orders
 
+    @api.model
+    def _prepare_scrap_vals(self, scrap_lines, loading_request):
+        """
+        Values of one scrap order per line, scrapping from the van.
+        :param scrap_lines: records with product_id and scrap_quantity in
+                            bags/baskets/pieces.
+        """
+        scrap_location = self.env.company.scrap_location_id 
         if not scrap_location:
             raise UserError(_("Please configure a scrap location in the company settings."))
             
-        search_location = loading_request.salesman_id.accessible_location_id
-        if loading_request.is_concrete:
-            search_location = loading_request.car_id.location_id
-        source_location = search_location
+        source_location = loading_request._get_van_location()
         if not source_location:
             raise UserError(_("The salesman %s does not have an accessible stock location configured.") % loading_request.salesman_id.name)
             
-        for line in scrap_lines:
-            product = line.product_id
-            qty_to_scrap_pcs = line.scrap_quantity
-            if product.ice_product_type == '4kg':
-                qty_to_scrap_pcs = line.scrap_quantity * (product.pcs_per_bag or 8)
-            elif product.ice_product_type == 'cup':
-                qty_to_scrap_pcs = line.scrap_quantity * (product.pcs_per_basket or 24)
-
-            scrap_order = self.env['stock.scrap'].create({
-                'product_id': product.id,
-                'scrap_qty': qty_to_scrap_pcs,
-                'product_uom_id': product.uom_id.id,
-                'location_id': source_location.id,
-                'scrap_location_id': scrap_location.id,
-                'origin': f"{loading_request.name} (Return Scrap)",
-            })
-            scrap_order.action_validate()
-            scrap_orders |= scrap_order
-            
-        return scrap_orders
+        return [{
+            'product_id': line.product_id.id,
+            'scrap_qty': line.scrap_quantity * line.product_id._get_ice_pcs_per_unit(),
+            'product_uom_id': line.product_id.uom_id.id,
+            'location_id': source_location.id,
+            'scrap_location_id': scrap_location.id,
+            'origin': f"{loading_request.name} (Return Scrap)",
+            'loading_request_id': loading_request.id,
+        } for line in scrap_lines]
 
 
 class WarehouseReturnWizardLine(models.TransientModel):